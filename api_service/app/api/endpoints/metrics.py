@@ -1,5 +1,7 @@
 from fastapi import APIRouter
-from app.core.metrics import metrics_store
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.core.metrics import metrics_store, prometheus_registry
 from app.logger_config import logger
 
 router = APIRouter()
@@ -13,14 +15,12 @@ async def get_metrics():
                 "route_name": route,
                 "hits": data["hits"],
                 "errors": data["errors"],
-                "avg_time": (
-                    round(sum(data["times"]) / len(data["times"]), 2)
-                    if data["times"]
-                    else 0
-                ),
-                "max_time": round(max(data["times"]), 2) if data["times"] else 0,
-                "min_time": round(min(data["times"]), 2) if data["times"] else 0,
+                **data["latency"].summary(),
             }
             for route, data in metrics_store.items()
         }
     }
+
+@router.get("/prometheus")
+async def get_prometheus_metrics():
+    return Response(generate_latest(prometheus_registry), media_type=CONTENT_TYPE_LATEST)
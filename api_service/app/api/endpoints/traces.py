@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.core.config import async_redis_conn
+from app.core.tracing import get_trace, slowest_traces
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_traces(limit: int = Query(20, ge=1, le=200)):
+    """Sampled (or slow) traces still stored, slowest first."""
+    return {"traces": await slowest_traces(async_redis_conn, limit)}
+
+
+@router.get("/{trace_id}")
+async def get_trace_summary(trace_id: str):
+    """Per-stage timings of one request, from the endpoint and every job it waited on."""
+    trace = await get_trace(async_redis_conn, trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found or not sampled")
+    return trace
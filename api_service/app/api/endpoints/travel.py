@@ -1,13 +1,26 @@
-import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
 from fastapi_cache.decorator import cache
+from rq.job import JobStatus
+from starlette.concurrency import run_in_threadpool
 import time
 from app.models.responses.best_travel_month import BestTravelMonthResponse
 from app.models.requests.best_travel_month import BestTravelMonthFinderRequest
+from app.models.responses.best_destinations import BestDestinationsResponse
+from app.models.requests.best_destinations import BestDestinationsRequest
 from app.models.responses.city_weather_comparison import CityWeatherComparisonResponse
 from app.models.requests.city_weather_comparison import CityWeatherComparisonRequest
-from app.services.queue_service import queue
+from app.services.destinations import find_best_destinations
+from app.services.profile_cache import cached_best_month, cached_comparison
+from app.services.queue_service import (
+    enqueue_once,
+    is_retryable,
+    requeue_job,
+    wait_for_job,
+)
+from app.core.config import async_redis_conn
 from app.core.metrics import update_metrics
+from app.core.tracing import TRACE_HEADER, RequestTrace
 from app.logger_config import logger
 
 router = APIRouter()
@@ -16,27 +29,36 @@ router = APIRouter()
 @router.get("/best-month", response_model=BestTravelMonthResponse)
 @cache(expire=300)
 async def get_best_travel_month(
+    response: Response,
     request: BestTravelMonthFinderRequest = Depends(
         BestTravelMonthFinderRequest.validate_params
     ),
 ):
     start_time = time.time()
+    trace = RequestTrace("/travel/best-month")
+    response.headers[TRACE_HEADER] = trace.id
     logger.info(f"Processing best travel month request for city: {request.city}")
     try:
-        job = queue.enqueue(
-            "worker.find_best_month", 
-            request.city, 
-            request.min_temp, 
-            request.max_temp,
-            job_timeout='5m'  # Add timeout
+        cached = await trace.timed(
+            "cache", cached_best_month(request.city, request.min_temp, request.max_temp)
         )
-        logger.info(f"Job enqueued with ID: {job.id}")
+        if cached is not None:
+            update_metrics("/travel/best-month", time.time() - start_time)
+            return cached
 
-        while not job.is_finished and not job.is_failed:
-            job.refresh()
-            await asyncio.sleep(0.1)  # Prevent tight loop
+        with trace.span("enqueue"):
+            job = await run_in_threadpool(
+                enqueue_once,
+                "worker.find_best_month", 
+                request.city, 
+                request.min_temp, 
+                request.max_temp,
+                job_timeout='5m',  # Add timeout
+                trace=trace,
+            )
+        logger.info(f"Job enqueued with ID: {job.id}")
 
-        if job.is_failed:
+        if await trace.timed("wait", wait_for_job(job)) == JobStatus.FAILED:
             error_message = job.exc_info or "Job failed without specific error message"
             logger.error(f"Job failed: {error_message}")
             raise HTTPException(status_code=500, detail=error_message)
@@ -51,52 +73,97 @@ async def get_best_travel_month(
 
         return result
     except Exception as e:
+        trace.error = True
         duration = time.time() - start_time
         update_metrics("/travel/best-month", duration, error=True)
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await trace.finish(async_redis_conn)
 
 
 @router.get("/compare-cities", response_model=CityWeatherComparisonResponse)
 @cache(expire=300)
 async def compare_cities(
+    response: Response,
     request: CityWeatherComparisonRequest = Depends(
         CityWeatherComparisonRequest.validate_params
     ),
 ):
     start_time = time.time()
+    trace = RequestTrace("/travel/compare-cities")
+    response.headers[TRACE_HEADER] = trace.id
     try:
-        job = queue.enqueue("worker.compare_cities", request.cities, request.month)
+        cached = await trace.timed("cache", cached_comparison(request.cities, request.month))
+        if cached is not None:
+            update_metrics("/travel/compare-cities", time.time() - start_time)
+            return cached
+
+        with trace.span("enqueue"):
+            job = await run_in_threadpool(
+                enqueue_once, "worker.compare_cities", request.cities, request.month, trace=trace
+            )
         max_retries = 3
         retry_count = 0
         
-        while not job.is_finished:
-            job.refresh()
-            if job.is_failed:
-                if retry_count < max_retries:
-                    retry_count += 1
-                    job.requeue()
-                    continue
-                error_message = job.exc_info.strip() if job.exc_info else "Unknown error occurred"
-                duration = time.time() - start_time
-                update_metrics("/travel/compare-cities", duration, error=True)
-                raise HTTPException(
-                    status_code=500,
-                    detail={
-                        "error": error_message,
-                        "retry_count": retry_count,
-                        "job_id": job.id
-                    }
-                )
+        while await trace.timed("wait", wait_for_job(job)) == JobStatus.FAILED:
+            if retry_count < max_retries and is_retryable(job):
+                retry_count += 1
+                await requeue_job(job)
+                continue
+            error_message = job.exc_info.strip() if job.exc_info else "Unknown error occurred"
+            duration = time.time() - start_time
+            update_metrics("/travel/compare-cities", duration, error=True)
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "error": error_message,
+                    "retry_count": retry_count,
+                    "job_id": job.id
+                }
+            )
 
         duration = time.time() - start_time
         update_metrics("/travel/compare-cities", duration)
         return job.result
 
     except Exception as e:
+        trace.error = True
         duration = time.time() - start_time
         update_metrics("/travel/compare-cities", duration, error=True)
         raise HTTPException(
             status_code=500, 
             detail=str(e)
         )
+    finally:
+        await trace.finish(async_redis_conn)
+
+
+@router.get("/best-destinations", response_model=BestDestinationsResponse)
+@cache(expire=60)
+async def get_best_destinations(
+    response: Response,
+    request: BestDestinationsRequest = Depends(BestDestinationsRequest.validate_params),
+):
+    """Best (city, month) pairs for a temperature range among every cached city."""
+    start_time = time.time()
+    trace = RequestTrace("/travel/best-destinations")
+    response.headers[TRACE_HEADER] = trace.id
+    try:
+        # Served from the API's own copy of the index, no job involved
+        with trace.span("index"):
+            result = await run_in_threadpool(
+                find_best_destinations, request.min_temp, request.max_temp, request.limit
+            )
+
+        duration = time.time() - start_time
+        update_metrics("/travel/best-destinations", duration)
+        return result
+    except Exception as e:
+        trace.error = True
+        duration = time.time() - start_time
+        update_metrics("/travel/best-destinations", duration, error=True)
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await trace.finish(async_redis_conn)
@@ -1,10 +1,25 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from fastapi_cache.decorator import cache
+from rq.job import JobStatus
+from starlette.concurrency import run_in_threadpool
 import time
 from app.models.responses.monthly_weather_profile import MonthlyWeatherProfileResponse
 from app.models.requests.monthly_weather_profile import MonthlyWeatherProfileRequest
-from app.services.queue_service import queue
+from app.models.requests.batch_weather_profiles import BatchWeatherProfilesRequest
+from app.services.profile_cache import cached_monthly_profile
+from app.services.queue_service import (
+    enqueue_batch,
+    enqueue_once,
+    is_retryable,
+    iter_batch_results,
+    requeue_job,
+    wait_for_job,
+)
+from app.core.config import async_redis_conn
 from app.core.metrics import update_metrics
+from app.core.tracing import TRACE_HEADER, RequestTrace
 from app.logger_config import logger
 
 router = APIRouter()
@@ -12,46 +27,56 @@ router = APIRouter()
 @router.get("/monthly-profile", response_model=MonthlyWeatherProfileResponse)
 @cache(expire=300)
 async def get_monthly_profile(
+    response: Response,
     request: MonthlyWeatherProfileRequest = Depends(
         MonthlyWeatherProfileRequest.validate_params
     ),
 ):
     start_time = time.time()
+    trace = RequestTrace("/weather/monthly-profile")
+    response.headers[TRACE_HEADER] = trace.id
     logger.info(
         f"Processing monthly profile request for city: {request.city}, month: {request.month}"
     )
     
     try:
-        job = queue.enqueue("worker.get_monthly_profile", request.city, request.month)
+        cached = await trace.timed("cache", cached_monthly_profile(request.city, request.month))
+        if cached is not None:
+            update_metrics("/weather/monthly-profile", time.time() - start_time)
+            return cached
+
+        # Not cached, so the job needs upstream data
+        with trace.span("enqueue"):
+            job = await run_in_threadpool(
+                enqueue_once, "worker.get_monthly_profile", request.city, request.month, trace=trace
+            )
         logger.info(f"Job enqueued with ID: {job.id}")
         
         max_retries = 3
         retry_count = 0
         
-        while not job.is_finished:
-            job.refresh()
-            if job.is_failed:
-                if retry_count < max_retries:
-                    retry_count += 1
-                    logger.warning(f"Retrying job {job.id}, attempt {retry_count}")
-                    job.requeue()
-                    continue
-                    
-                error_message = job.exc_info.strip() if job.exc_info else "Unknown error occurred"
-                duration = time.time() - start_time
-                update_metrics("/weather/monthly-profile", duration, error=True)
-                logger.error(f"Job failed after {retry_count} retries: {error_message}")
+        while await trace.timed("wait", wait_for_job(job)) == JobStatus.FAILED:
+            if retry_count < max_retries and is_retryable(job):
+                retry_count += 1
+                logger.warning(f"Retrying job {job.id}, attempt {retry_count}")
+                await requeue_job(job)
+                continue
                 
-                raise HTTPException(
-                    status_code=500,
-                    detail={
-                        "error": error_message,
-                        "retry_count": retry_count,
-                        "job_id": job.id,
-                        "city": request.city,
-                        "month": request.month
-                    }
-                )
+            error_message = job.exc_info.strip() if job.exc_info else "Unknown error occurred"
+            duration = time.time() - start_time
+            update_metrics("/weather/monthly-profile", duration, error=True)
+            logger.error(f"Job failed after {retry_count} retries: {error_message}")
+            
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "error": error_message,
+                    "retry_count": retry_count,
+                    "job_id": job.id,
+                    "city": request.city,
+                    "month": request.month
+                }
+            )
 
         duration = time.time() - start_time
         update_metrics("/weather/monthly-profile", duration)
@@ -59,6 +84,7 @@ async def get_monthly_profile(
         return job.result
         
     except Exception as e:
+        trace.error = True
         duration = time.time() - start_time
         update_metrics("/weather/monthly-profile", duration, error=True)
         logger.error(f"Error processing request: {str(e)}")
@@ -66,3 +92,50 @@ async def get_monthly_profile(
             status_code=500,
             detail=str(e)
         )
+    finally:
+        await trace.finish(async_redis_conn)
+
+
+@router.post("/profiles")
+async def get_monthly_profiles(request: BatchWeatherProfilesRequest):
+    """Profiles for many (city, months) pairs, streamed as NDJSON, one line per city as it completes."""
+    start_time = time.time()
+    trace = RequestTrace("/weather/profiles")
+    queries = request.by_city()
+    logger.info(f"Processing batch profile request for {len(queries)} cities")
+
+    try:
+        with trace.span("enqueue"):
+            batch_id = await run_in_threadpool(enqueue_batch, queries, trace)
+    except Exception as e:
+        update_metrics("/weather/profiles", time.time() - start_time, error=True)
+        logger.error(f"Error enqueueing batch: {str(e)}")
+        trace.error = True
+        await trace.finish(async_redis_conn)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def stream():
+        pending = set(queries)
+        errors = 0
+        with trace.span("wait"):
+            async for result in iter_batch_results(batch_id, len(queries)):
+                if result is None:
+                    break
+                pending.discard(result["city"])
+                errors += "error" in result
+                yield json.dumps(result) + "\n"
+
+        for city in pending:
+            errors += 1
+            yield json.dumps({"city": city, "error": "Timed out waiting for result"}) + "\n"
+
+        duration = time.time() - start_time
+        update_metrics("/weather/profiles", duration, error=bool(errors))
+        logger.info(f"Batch {batch_id} completed in {duration:.2f}s with {errors} errors")
+        trace.error = bool(errors)
+        await trace.finish(async_redis_conn)
+
+    return StreamingResponse(
+        stream(), media_type="application/x-ndjson", headers={TRACE_HEADER: trace.id}
+    )
+
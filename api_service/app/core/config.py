@@ -1,13 +1,29 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from redis import Redis
+from redis import asyncio as aioredis
+from app.core.metrics import metrics_emitter
+from app.core.popularity import popularity
+from app.core.response_cache import TieredRedisBackend, canonical_key_builder
+
+redis_conn = Redis(host="redis")
+# Used for awaiting job completion without blocking the event loop
+async_redis_conn = aioredis.Redis(host="redis")
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
-    FastAPICache.init(InMemoryBackend(), prefix="weather-cache")
+    FastAPICache.init(
+        TieredRedisBackend(async_redis_conn),
+        prefix="weather-cache",
+        key_builder=canonical_key_builder,
+    )
+    flusher = asyncio.create_task(metrics_emitter.run(async_redis_conn))
+    popularity_flusher = asyncio.create_task(popularity.run(async_redis_conn))
     yield
-
-redis_conn = Redis(host="redis")
+    flusher.cancel()
+    popularity_flusher.cancel()
+    await metrics_emitter.flush(async_redis_conn)
+    await popularity.flush(async_redis_conn)
@@ -1,17 +1,201 @@
+import asyncio
+import math
+import time
+from collections import Counter, defaultdict
+
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from prometheus_client.registry import Collector, CollectorRegistry
+
 from app.logger_config import logger
+from histogram import (
+    HISTOGRAM_BUCKETS,
+    HISTOGRAM_BUCKETS_PER_DOUBLING,
+    METRICS_RETENTION,
+    METRICS_SERIES_KEY,
+    METRICS_SLOT_SECONDS,
+    bucket_index,
+    bucket_upper_bound,
+    histogram_key,
+)
+
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+METRICS_FLUSH_INTERVAL = 5
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram of durations in seconds.
+
+    record() is O(1) and reads are O(buckets); memory does not grow with
+    traffic. Bucket layouts are identical across instances, so histograms
+    from different processes can be merged by adding their counts.
+    """
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    bucket_index = staticmethod(bucket_index)
+    bucket_upper_bound = staticmethod(bucket_upper_bound)
+
+    def record(self, value: float):
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentiles(self, pcts=REPORTED_PERCENTILES) -> dict:
+        """{pct: value} for several percentiles in a single pass over the buckets."""
+        result = {}
+        if not self.count:
+            return {pct: 0 for pct in pcts}
+        ranks = sorted((math.ceil(self.count * pct / 100), pct) for pct in pcts)
+        seen = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            while position < len(ranks) and seen >= ranks[position][0]:
+                bound = self.bucket_upper_bound(index)
+                result[ranks[position][1]] = min(max(bound, self.min), self.max)
+                position += 1
+            if position == len(ranks):
+                break
+        return result
+
+    def summary(self) -> dict:
+        percentiles = self.percentiles()
+        return {
+            "avg_time": round(self.total / self.count, 4) if self.count else 0,
+            "max_time": round(self.max, 4) if self.count else 0,
+            "min_time": round(self.min, 4) if self.count else 0,
+            **{
+                f"p{str(pct).replace('.', '')}_time": round(value, 4)
+                for pct, value in percentiles.items()
+            },
+        }
+
+    def cumulative_buckets(self, step: int = HISTOGRAM_BUCKETS_PER_DOUBLING):
+        """Prometheus style [(le, cumulative count)], one bound per doubling plus +Inf."""
+        buckets = []
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if (index + 1) % step == 0:
+                buckets.append((f"{self.bucket_upper_bound(index):.6g}", seen))
+        buckets.append(("+Inf", self.count))
+        return buckets
+
+
+def new_route_metrics() -> dict:
+    return {"hits": 0, "errors": 0, "latency": LatencyHistogram()}
+
 
 metrics_store = {
-    "/weather/monthly-profile": {"hits": 0, "errors": 0, "times": []},
-    "/travel/best-month": {"hits": 0, "errors": 0, "times": []},
-    "/travel/compare-cities": {"hits": 0, "errors": 0, "times": []},
+    "/weather/monthly-profile": new_route_metrics(),
+    "/weather/profiles": new_route_metrics(),
+    "/travel/best-month": new_route_metrics(),
+    "/travel/compare-cities": new_route_metrics(),
+    "/travel/best-destinations": new_route_metrics(),
 }
 
+
+class MetricsEmitter:
+    """Buffers timing samples locally and writes them to Redis in batches.
+
+    Samples are bucketed per series and minute with the LatencyHistogram layout,
+    so metrics_service can merge every process into fleet-wide histograms.
+    """
+
+    def __init__(self):
+        self._pending = defaultdict(Counter)
+        self._sums = defaultdict(float)
+
+    def record(self, series: str, duration: float, error: bool = False):
+        slot = int(time.time() // METRICS_SLOT_SECONDS)
+        pending = self._pending[(series, slot)]
+        pending[f"b{LatencyHistogram.bucket_index(duration)}"] += 1
+        pending["count"] += 1
+        if error:
+            pending["errors"] += 1
+        self._sums[(series, slot)] += duration
+
+    def drain(self):
+        pending, self._pending = self._pending, defaultdict(Counter)
+        sums, self._sums = self._sums, defaultdict(float)
+        return pending, sums
+
+    def write(self, pipe, pending, sums):
+        """Queue the drained samples onto a (sync or async) pipeline."""
+        for (series, slot), fields in pending.items():
+            key = histogram_key(series, slot)
+            for field, count in fields.items():
+                pipe.hincrby(key, field, count)
+            pipe.hincrbyfloat(key, "sum", sums[(series, slot)])
+            pipe.expire(key, METRICS_RETENTION)
+            pipe.sadd(METRICS_SERIES_KEY, series)
+
+    async def flush(self, redis_conn):
+        pending, sums = self.drain()
+        if not pending:
+            return
+        async with redis_conn.pipeline(transaction=False) as pipe:
+            self.write(pipe, pending, sums)
+            await pipe.execute()
+
+    async def run(self, redis_conn, interval: float = METRICS_FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(redis_conn)
+            except Exception as e:
+                logger.error(f"Failed to flush metrics: {str(e)}")
+
+
+metrics_emitter = MetricsEmitter()
+
 def update_metrics(route: str, duration: float, error: bool = False):
+    metrics_emitter.record(f"route:{route}", duration, error)
     if route in metrics_store:
         metrics_store[route]["hits"] += 1
-        metrics_store[route]["times"].append(duration)
+        metrics_store[route]["latency"].record(duration)
         if error:
             metrics_store[route]["errors"] += 1
         logger.info(
             f"Metrics updated for {route}: Duration={duration:.2f}s, Error={error}"
         )
+
+
+class RouteMetricsCollector(Collector):
+    """Exposes metrics_store in the Prometheus text format."""
+
+    def collect(self):
+        hits = CounterMetricFamily("weather_api_requests", "Requests per route", labels=["route"])
+        errors = CounterMetricFamily("weather_api_errors", "Failed requests per route", labels=["route"])
+        latency = HistogramMetricFamily(
+            "weather_api_request_duration_seconds", "Request duration per route", labels=["route"]
+        )
+        for route, data in metrics_store.items():
+            hits.add_metric([route], data["hits"])
+            errors.add_metric([route], data["errors"])
+            histogram = data["latency"]
+            latency.add_metric([route], histogram.cumulative_buckets(), histogram.total)
+        yield hits
+        yield errors
+        yield latency
+
+
+prometheus_registry = CollectorRegistry()
+prometheus_registry.register(RouteMetricsCollector())
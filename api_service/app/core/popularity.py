@@ -0,0 +1,49 @@
+import asyncio
+from collections import Counter
+from typing import List
+
+from app.logger_config import logger
+
+# Must match worker_service/warming.py
+POPULARITY_KEY = "popularity:cities"
+POPULARITY_NAMES_KEY = "popularity:names"
+POPULARITY_FLUSH_INTERVAL = 5
+
+
+class PopularityRecorder:
+    """Counts cities served from the fast path so cache warming still sees them.
+
+    Same Redis sorted set as the workers' PopularityTracker, flushed in batches.
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+        self._names = {}
+
+    def record(self, cities: List[str]):
+        for city in cities:
+            member = city.strip().lower()
+            self._pending[member] += 1
+            self._names.setdefault(member, city.strip())
+
+    async def flush(self, redis_conn):
+        pending, self._pending = self._pending, Counter()
+        names, self._names = self._names, {}
+        if not pending:
+            return
+        async with redis_conn.pipeline(transaction=False) as pipe:
+            for member, count in pending.items():
+                pipe.zincrby(POPULARITY_KEY, count, member)
+                pipe.hsetnx(POPULARITY_NAMES_KEY, member, names[member])
+            await pipe.execute()
+
+    async def run(self, redis_conn, interval: float = POPULARITY_FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(redis_conn)
+            except Exception as e:
+                logger.error(f"Failed to flush popularity counts: {str(e)}")
+
+
+popularity = PopularityRecorder()
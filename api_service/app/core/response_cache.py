@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi_cache.types import Backend
+from pydantic import BaseModel
+
+from app.logger_config import logger
+
+# Total bytes of cached responses kept in Redis before the least recently used are evicted
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Anything not read or written for this long has expired and is dropped from the accounting
+RESPONSE_CACHE_MAX_AGE = 3600
+LOCAL_CACHE_SIZE = 512
+# Local copies live at most this long so processes don't drift from Redis
+LOCAL_CACHE_TTL = 30
+
+INDEX_KEY = "response-cache:index"  # sorted set of key -> last access (ms)
+EXPIRY_KEY = "response-cache:expiry"  # sorted set of key -> expiry (ms)
+SIZES_KEY = "response-cache:sizes"  # hash of key -> bytes
+TOTAL_KEY = "response-cache:bytes"
+
+# Stores one entry and keeps the byte accounting in line. Entries Redis already
+# expired are dropped from the accounting; the keys of entries idle past
+# max_age or evicted to stay under the cap are returned for the caller to
+# delete, so the script only touches the keys it is passed.
+SET_SCRIPT = """
+local key, index, expiry, sizes, total = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local value, expire, now = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local cap, max_age = tonumber(ARGV[4]), tonumber(ARGV[5])
+
+local function forget(victim)
+    local size = tonumber(redis.call('HGET', sizes, victim) or '0')
+    redis.call('HDEL', sizes, victim)
+    redis.call('ZREM', index, victim)
+    redis.call('ZREM', expiry, victim)
+    return redis.call('INCRBY', total, -size)
+end
+
+for _, victim in ipairs(redis.call('ZRANGEBYSCORE', expiry, '-inf', now)) do
+    if victim ~= key then
+        forget(victim)
+    end
+end
+local victims = {}
+for _, victim in ipairs(redis.call('ZRANGEBYSCORE', index, '-inf', now - max_age * 1000)) do
+    if victim ~= key then
+        forget(victim)
+        table.insert(victims, victim)
+    end
+end
+
+local old = tonumber(redis.call('HGET', sizes, key) or '0')
+local size = string.len(value)
+if expire > 0 then
+    redis.call('SET', key, value, 'EX', expire)
+    redis.call('ZADD', expiry, now + expire * 1000, key)
+else
+    redis.call('SET', key, value)
+    redis.call('ZREM', expiry, key)
+end
+redis.call('HSET', sizes, key, size)
+redis.call('ZADD', index, now, key)
+local used = redis.call('INCRBY', total, size - old)
+
+while used > cap do
+    local oldest = redis.call('ZRANGE', index, 0, 0)
+    if #oldest == 0 or oldest[1] == key then
+        break
+    end
+    used = forget(oldest[1])
+    table.insert(victims, oldest[1])
+end
+return victims
+"""
+
+
+def canonical_value(value: Any) -> Any:
+    """Normalize request params so equivalent requests share a key.
+
+    Strings are case and whitespace folded and lists are sorted, so
+    `cities=London,Paris` and `cities=Paris, london` produce the same value.
+    """
+    if isinstance(value, BaseModel):
+        return canonical_value(value.model_dump())
+    if isinstance(value, dict):
+        return {str(k): canonical_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [canonical_value(v) for v in value]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, str):
+        return " ".join(value.casefold().split())
+    return value
+
+
+def canonical_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request=None,
+    response=None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    payload = json.dumps(canonical_value(kwargs), sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f"{namespace}:{func.__module__}:{func.__name__}:{digest}"
+
+
+class LocalLRU:
+    """Small per-process LRU of (value, expires_at) used in front of Redis."""
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key: str) -> Tuple[int, Optional[bytes]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return 0, None
+        value, expires_at = entry
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            del self._data[key]
+            return 0, None
+        self._data.move_to_end(key)
+        return int(remaining), value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self, prefix: str = ""):
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+
+class TieredRedisBackend(Backend):
+    """fastapi-cache backend: per-process LRU in front of a size-capped Redis tier
+    shared by every API process."""
+
+    def __init__(self, redis_conn, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.redis_conn = redis_conn
+        self.max_bytes = max_bytes
+        self.local = LocalLRU()
+        self._set = redis_conn.register_script(SET_SCRIPT)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = self.local.get(key)
+        if value is not None:
+            return ttl, value
+
+        async with self.redis_conn.pipeline(transaction=False) as pipe:
+            pipe.ttl(key)
+            pipe.get(key)
+            pipe.zadd(INDEX_KEY, {key: int(time.time() * 1000)}, xx=True)
+            ttl, value, _ = await pipe.execute()
+
+        if value is not None and ttl > 0:
+            self.local.set(key, value, min(ttl, LOCAL_CACHE_TTL))
+        return max(ttl, 0), value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        if expire:
+            self.local.set(key, value, min(expire, LOCAL_CACHE_TTL))
+        victims = await self._set(
+            keys=[key, INDEX_KEY, EXPIRY_KEY, SIZES_KEY, TOTAL_KEY],
+            args=[value, expire or 0, int(time.time() * 1000), self.max_bytes, RESPONSE_CACHE_MAX_AGE],
+        )
+        if victims:
+            for victim in victims:
+                self.local.delete(victim.decode())
+            await self.redis_conn.delete(*victims)
+            logger.info(f"Response cache dropped {len(victims)} idle or evicted entries")
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        prefix = namespace or ""
+        if key:
+            victims = [key]
+        else:
+            # Only touch keys this cache wrote; the same Redis holds the job queues
+            members = await self.redis_conn.zrange(INDEX_KEY, 0, -1)
+            victims = [m.decode() for m in members if m.decode().startswith(prefix)]
+        if not victims:
+            return 0
+
+        async with self.redis_conn.pipeline(transaction=False) as pipe:
+            for victim in victims:
+                self.local.delete(victim)
+                pipe.hget(SIZES_KEY, victim)
+            sizes = await pipe.execute()
+        async with self.redis_conn.pipeline(transaction=False) as pipe:
+            pipe.delete(*victims)
+            pipe.zrem(INDEX_KEY, *victims)
+            pipe.zrem(EXPIRY_KEY, *victims)
+            pipe.hdel(SIZES_KEY, *victims)
+            pipe.decrby(TOTAL_KEY, sum(int(size or 0) for size in sizes))
+            removed, *_ = await pipe.execute()
+        return removed
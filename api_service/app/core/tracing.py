@@ -0,0 +1,119 @@
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional
+
+from app.core.metrics import metrics_emitter
+from app.logger_config import logger
+
+# Must match worker_service/tracing.py
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_SLOW_THRESHOLD = float(os.getenv("TRACE_SLOW_THRESHOLD", "5"))
+TRACE_TTL = 3600
+RECENT_TRACES_KEY = "traces:recent"
+MAX_RECENT_TRACES = 1000
+TRACE_HEADER = "X-Trace-Id"
+
+
+def trace_key(trace_id: str) -> str:
+    return f"trace:{trace_id}"
+
+
+class RequestTrace:
+    """Spans of one API request.
+
+    The trace id and sampling decision are attached to the jobs it enqueues
+    (job.meta["trace"]), so the workers' spans end up under the same id.
+    """
+
+    def __init__(self, route: str):
+        self.id = uuid.uuid4().hex
+        self.route = route
+        self.sampled = random.random() < TRACE_SAMPLE_RATE
+        self.started = time.perf_counter()
+        self.spans = []
+        self.job_ids = []
+        self.error = False
+
+    def context(self) -> dict:
+        return {"id": self.id, "sampled": self.sampled}
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start - self.started, time.perf_counter() - start))
+
+    async def timed(self, name: str, awaitable):
+        with self.span(name):
+            return await awaitable
+
+    async def finish(self, redis_conn):
+        """Record per-stage timings, and store the summary if sampled or slow."""
+        duration = time.perf_counter() - self.started
+        stages = defaultdict(float)
+        for name, _, span_duration in self.spans:
+            stages[name] += span_duration
+        for name, total in stages.items():
+            metrics_emitter.record(f"stage:api.{name}", total)
+
+        if not self.sampled and duration < TRACE_SLOW_THRESHOLD:
+            return
+        summary = {
+            "route": self.route,
+            "error": self.error,
+            "job_ids": self.job_ids,
+            "duration_ms": round(duration * 1000, 2),
+            "stages": {name: round(total * 1000, 2) for name, total in sorted(stages.items())},
+            "spans": [
+                [name, round(start * 1000, 2), round(span_duration * 1000, 2)]
+                for name, start, span_duration in self.spans
+            ],
+        }
+        try:
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                pipe.hset(trace_key(self.id), "api", json.dumps(summary))
+                pipe.expire(trace_key(self.id), TRACE_TTL)
+                pipe.zadd(RECENT_TRACES_KEY, {self.id: duration}, gt=True)
+                pipe.zremrangebyrank(RECENT_TRACES_KEY, 0, -MAX_RECENT_TRACES - 1)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to store trace {self.id}: {str(e)}")
+
+
+async def get_trace(redis_conn, trace_id: str) -> Optional[dict]:
+    """The API's and every job's summary of one trace, None once it has expired."""
+    fields = await redis_conn.hgetall(trace_key(trace_id))
+    if not fields:
+        return None
+    fields = {name.decode(): json.loads(value) for name, value in fields.items()}
+    jobs = [summary for name, summary in fields.items() if name.startswith("job:")]
+    return {
+        "trace_id": trace_id,
+        "api": fields.get("api"),
+        "jobs": sorted(jobs, key=lambda job: job["job_id"]),
+    }
+
+
+async def slowest_traces(redis_conn, limit: int) -> list:
+    """Stored traces, slowest first. Ids whose trace has expired are dropped on the way."""
+    entries = await redis_conn.zrevrange(RECENT_TRACES_KEY, 0, limit - 1, withscores=True)
+    async with redis_conn.pipeline(transaction=False) as pipe:
+        for trace_id, _ in entries:
+            pipe.exists(trace_key(trace_id.decode()))
+        alive = await pipe.execute()
+
+    expired = [trace_id for (trace_id, _), exists in zip(entries, alive) if not exists]
+    if expired:
+        await redis_conn.zrem(RECENT_TRACES_KEY, *expired)
+    return [
+        {"trace_id": trace_id.decode(), "duration_ms": round(duration * 1000, 2)}
+        for (trace_id, duration), exists in zip(entries, alive)
+        if exists
+    ]
@@ -0,0 +1,68 @@
+
+from typing import Dict, List
+
+from pydantic import BaseModel, Field, field_validator
+
+MAX_BATCH_CITIES = 100
+
+class CityMonthsQuery(BaseModel):
+    city: str = Field(..., description="Name of the city")
+    months: List[int] = Field(
+        default_factory=lambda: list(range(1, 13)),
+        description="Month numbers (1-12), all months when omitted",
+    )
+
+    @field_validator("city")
+    @classmethod
+    def city_must_not_be_empty(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError("city must not be empty")
+        return value.strip()
+
+    @field_validator("months")
+    @classmethod
+    def validate_months(cls, value: List[int]) -> List[int]:
+        if not value:
+            raise ValueError("months must not be empty")
+        if any(month < 1 or month > 12 for month in value):
+            raise ValueError("months must be between 1 and 12")
+        return sorted(set(value))
+
+
+class BatchWeatherProfilesRequest(BaseModel):
+    queries: List[CityMonthsQuery] = Field(
+        ..., description=f"Cities and months to profile (1-{MAX_BATCH_CITIES} cities)"
+    )
+
+    @field_validator("queries")
+    @classmethod
+    def validate_queries(cls, value: List[CityMonthsQuery]) -> List[CityMonthsQuery]:
+        if not value:
+            raise ValueError("Minimum 1 city required")
+        if len({query.city.lower() for query in value}) > MAX_BATCH_CITIES:
+            raise ValueError(f"Maximum {MAX_BATCH_CITIES} cities allowed")
+        return value
+
+    def by_city(self) -> Dict[str, List[int]]:
+        """Merge queries for the same city (case insensitive) into one month list."""
+        grouped = {}
+        names = {}
+        for query in self.queries:
+            name = names.setdefault(query.city.lower(), query.city)
+            grouped[name] = sorted(set(grouped.get(name, [])) | set(query.months))
+        return grouped
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "queries": [
+                        {"city": "London", "months": [6, 7, 8]},
+                        {"city": "Paris"},
+                    ]
+                }
+            ]
+        }
+    }
+
+
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+
+from fastapi import HTTPException, Query
+
+MAX_DESTINATIONS = 100
+
+
+class BestDestinationsRequest(BaseModel):
+    min_temp: float = Field(
+        ..., description="Minimum preferred temperature", ge=-50, le=50
+    )
+    max_temp: float = Field(
+        ..., description="Maximum preferred temperature", ge=-50, le=50
+    )
+    limit: int = Field(10, description="Number of destinations to return", ge=1, le=MAX_DESTINATIONS)
+
+    @classmethod
+    async def validate_params(
+        cls,
+        min_temp: float = Query(
+            ..., ge=-50, le=50, description="Minimum preferred temperature"
+        ),
+        max_temp: float = Query(
+            ..., ge=-50, le=50, description="Maximum preferred temperature"
+        ),
+        limit: int = Query(
+            10, ge=1, le=MAX_DESTINATIONS, description="Number of destinations to return"
+        ),
+    ) -> "BestDestinationsRequest":
+        if max_temp <= min_temp:
+            raise HTTPException(
+                status_code=422, detail="max_temp must be greater than min_temp"
+            )
+        return cls(min_temp=min_temp, max_temp=max_temp, limit=limit)
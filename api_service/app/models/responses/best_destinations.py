@@ -0,0 +1,41 @@
+from typing import Annotated, List
+
+from pydantic import BaseModel, Field
+
+
+class Destination(BaseModel):
+    city: str
+    month: int = Field(ge=1, le=12)
+    min_temp_avg: float
+    max_temp_avg: float
+    min_temp_diff: Annotated[float, Field(ge=0)]
+    max_temp_diff: Annotated[float, Field(ge=0)]
+    overall_diff: Annotated[float, Field(ge=0)] = Field(
+        description="Sum of min_temp_diff and max_temp_diff"
+    )
+
+
+class BestDestinationsResponse(BaseModel):
+    indexed: int = Field(description="Number of cached (city, month) profiles searched")
+    destinations: List[Destination] = Field(description="Best matches first")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "indexed": 24,
+                    "destinations": [
+                        {
+                            "city": "London",
+                            "month": 7,
+                            "min_temp_avg": 14.2,
+                            "max_temp_avg": 24.1,
+                            "min_temp_diff": 0.8,
+                            "max_temp_diff": 0.9,
+                            "overall_diff": 1.7,
+                        }
+                    ],
+                }
+            ]
+        }
+    }
@@ -12,6 +12,10 @@ class RouteMetrics(BaseModel):
     avg_time: float = Field(ge=0)
     max_time: float = Field(ge=0)
     min_time: float = Field(ge=0)
+    p50_time: float = Field(ge=0)
+    p90_time: float = Field(ge=0)
+    p99_time: float = Field(ge=0)
+    p999_time: float = Field(ge=0)
 
 
 class MetricsResponse(BaseModel):
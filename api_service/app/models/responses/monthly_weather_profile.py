@@ -1,7 +1,7 @@
 
 from pydantic import BaseModel, Field, field_validator
 
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
 class MonthlyWeatherProfileResponse(BaseModel):
     city: str
@@ -12,8 +12,23 @@ class MonthlyWeatherProfileResponse(BaseModel):
     max_temp_avg: Annotated[float, Field(ge=-50, le=50)] = Field(
         description="Average maximum temperature"
     )
+    min_temp_std: Optional[float] = Field(
+        default=None, description="Standard deviation of daily minimum temperature"
+    )
+    max_temp_std: Optional[float] = Field(
+        default=None, description="Standard deviation of daily maximum temperature"
+    )
+    min_temp_p10: Optional[float] = None
+    min_temp_p50: Optional[float] = None
+    min_temp_p90: Optional[float] = None
+    max_temp_p10: Optional[float] = None
+    max_temp_p50: Optional[float] = None
+    max_temp_p90: Optional[float] = None
 
+    # Opt-in variables (EXTRA_DAILY_VARIABLES, HOURLY_VARIABLES on the workers)
+    # add their own fields, e.g. precip_avg or hourly_humidity_p90
     model_config = {
+        "extra": "allow",
         "json_schema_extra": {
             "examples": [
                 {
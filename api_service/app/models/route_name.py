@@ -3,7 +3,9 @@ from enum import Enum
 
 class RouteName(Enum):
     MONTHLY_WEATHER_PROFILE = "/weather/monthly-profile"
+    BATCH_WEATHER_PROFILES = "/weather/profiles"
     BEST_TRAVEL_MONTH_FINDER = "/travel/best-month"
     CITY_WEATHER_COMPARISON = "/travel/compare-cities"
+    BEST_DESTINATIONS = "/travel/best-destinations"
 
 
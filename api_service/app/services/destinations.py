@@ -0,0 +1,17 @@
+from app.core.config import redis_conn
+from climate_index import ClimateIndex
+
+# This process's copy of the points the workers publish as they cache profiles
+climate_index = ClimateIndex(redis_conn)
+
+
+def find_best_destinations(min_temp: float, max_temp: float, limit: int = 10) -> dict:
+    """Best (city, month) pairs among every cached profile, from the in-memory index.
+
+    The first call loads the index, later ones only pick up what changed.
+    """
+    climate_index.sync()
+    return {
+        "indexed": len(climate_index),
+        "destinations": climate_index.nearest(min_temp, max_temp, limit),
+    }
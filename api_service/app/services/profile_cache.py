@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional
+
+from rq import Queue
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import async_redis_conn, redis_conn
+from app.core.popularity import popularity
+from app.logger_config import logger
+from codec import decode_profile
+from profile_policy import (
+    REFRESH_JOB,
+    REFRESH_LOCK_TTL,
+    REFRESH_QUEUE,
+    is_stale,
+    profile_key,
+    refresh_lock_key,
+)
+
+refresh_queue = Queue(REFRESH_QUEUE, connection=redis_conn)
+
+
+def schedule_refresh(city: str):
+    if redis_conn.set(refresh_lock_key(city), 1, nx=True, ex=REFRESH_LOCK_TTL):
+        logger.info(f"Serving stale profiles for {city}, scheduling refresh")
+        refresh_queue.enqueue(REFRESH_JOB, city)
+
+
+async def get_cached_profiles(cities: List[str], months) -> Optional[Dict[str, list]]:
+    """{city: [profile per month]} with one MGET, or None unless every profile is cached.
+
+    Stale profiles are still returned, with a background refresh scheduled
+    like the workers do.
+    """
+    months = list(months)
+    keys = [profile_key(city, month) for city in cities for month in months]
+    values = await async_redis_conn.mget(keys)
+    if any(value is None for value in values):
+        return None
+
+    profiles = {}
+    stale = []
+    for index, city in enumerate(cities):
+        city_profiles = [
+            decode_profile(value)
+            for value in values[index * len(months) : (index + 1) * len(months)]
+        ]
+        profiles[city] = city_profiles
+        if any(is_stale(profile) for profile in city_profiles):
+            stale.append(city)
+
+    for city in stale:
+        await run_in_threadpool(schedule_refresh, city)
+    popularity.record(cities)
+    return profiles
+
+
+async def cached_monthly_profile(city: str, month: int) -> Optional[dict]:
+    profiles = await get_cached_profiles([city], [month])
+    return profiles[city][0] if profiles else None
+
+
+async def cached_best_month(city: str, min_temp: float, max_temp: float) -> Optional[dict]:
+    """Same scoring as worker.find_best_month, over the 12 cached months."""
+    profiles = await get_cached_profiles([city], range(1, 13))
+    if profiles is None:
+        return None
+
+    best = None
+    for profile in profiles[city]:
+        min_diff = abs(profile["min_temp_avg"] - min_temp)
+        max_diff = abs(profile["max_temp_avg"] - max_temp)
+        # Earliest month wins ties, like argmin
+        if best is None or min_diff + max_diff < best[0]:
+            best = (min_diff + max_diff, profile["month"], min_diff, max_diff)
+
+    overall, month, min_diff, max_diff = best
+    return {
+        "city": city,
+        "best_month": month,
+        "min_temp_diff": round(min_diff, 2),
+        "max_temp_diff": round(max_diff, 2),
+        "overall_diff": round(overall, 2),
+    }
+
+
+async def cached_comparison(cities: List[str], month: int) -> Optional[dict]:
+    """Same shape as worker.compare_cities, from each city's cached profile of `month`."""
+    cities = [city.strip() for city in cities]
+    profiles = await get_cached_profiles(cities, [month])
+    if profiles is None:
+        return None
+    return {
+        "month": month,
+        "cities": {
+            city_profiles[0]["city"]: {
+                "min_temp_avg": city_profiles[0]["min_temp_avg"],
+                "max_temp_avg": city_profiles[0]["max_temp_avg"],
+            }
+            for city_profiles in profiles.values()
+        },
+    }
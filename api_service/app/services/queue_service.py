@@ -1,4 +1,184 @@
+import asyncio
+import hashlib
+import json
+import uuid
+
+from redis.exceptions import WatchError
 from rq import Queue
-from app.core.config import redis_conn
+from rq.exceptions import InvalidJobOperation, NoSuchJobError
+from rq.job import Job, JobStatus
+from starlette.concurrency import run_in_threadpool
+from app.core.config import async_redis_conn, redis_conn
+from app.core.tracing import RequestTrace
+from app.services.profile_cache import profile_key
+from app.logger_config import logger
+
+# Cost classes, the workers dequeue them weighted-fair (worker_service/fair_queue.py)
+QUEUE_FAST = "fast"  # every profile the job reads is already cached
+QUEUE_SLOW = "slow"  # needs upstream calls and aggregation
+queues = {name: Queue(name, connection=redis_conn) for name in (QUEUE_FAST, QUEUE_SLOW)}
+
+# Upper bound on how long an identical request can join an in-flight job
+INFLIGHT_TTL = 300
+# Longest an endpoint waits for a job, a bit over the longest job_timeout
+JOB_WAIT_TIMEOUT = 360
+# Fallback status check in case a completion notice never arrives (e.g. worker killed)
+JOB_NOTIFY_CHECK_INTERVAL = 5
+JOB_NOTIFY_EXPIRY = 600
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED)
+# job.meta["error_kind"] the workers set for an unknown city or an open circuit
+# breaker (worker_service/errors.py), requeueing those only repeats the failure
+NON_RETRYABLE_ERRORS = ("terminal", "unavailable")
+
+
+def inflight_key(func_name: str, args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str).lower()
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f"inflight:{func_name}:{digest}"
+
+
+def enqueue_once(func_name: str, *args, queue_name: str = QUEUE_SLOW, trace: RequestTrace = None,
+                 **kwargs) -> Job:
+    """Enqueue a job on `queue_name`, or return the queued/running job of an identical request.
+
+    A new job carries `trace`'s id, a joined one stays under the trace that enqueued it.
+    """
+    key = inflight_key(func_name, args, kwargs)
+    meta = {"trace": trace.context()} if trace else None
+
+    while True:
+        job_id = uuid.uuid4().hex
+        if redis_conn.set(key, job_id, nx=True, ex=INFLIGHT_TTL):
+            job = queues[queue_name].enqueue(func_name, *args, job_id=job_id, meta=meta, **kwargs)
+            if trace:
+                trace.job_ids.append(job.id)
+            return job
+
+        existing_id = redis_conn.get(key)
+        if existing_id is None:
+            continue
+        try:
+            job = Job.fetch(existing_id.decode(), connection=redis_conn)
+            if job.get_status() in ACTIVE_STATUSES:
+                logger.info(f"Joining in-flight job {job.id} for {func_name}{args}")
+                if trace:
+                    trace.job_ids.append(job.id)
+                return job
+        except NoSuchJobError:
+            pass
+
+        # The shared job is done or gone, only replace it if nobody beat us to it
+        pipe = redis_conn.pipeline()
+        pipe.watch(key)
+        try:
+            if pipe.get(key) == existing_id:
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+        except WatchError:
+            pass
+        finally:
+            pipe.reset()
+
+
+def notify_key(job_id: str) -> str:
+    return f"job-done:{job_id}"
+
+
+async def wait_for_job(job: Job, timeout: float = JOB_WAIT_TIMEOUT) -> JobStatus:
+    """Await a job's final status; the worker pushes it onto job-done:<id> when done.
+
+    The notice is pushed back after reading so every request sharing the job sees it.
+    Returns the refreshed status, raising TimeoutError if the job outlives `timeout`.
+    """
+    key = notify_key(job.id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    while True:
+        await run_in_threadpool(job.refresh)
+        status = job.get_status(refresh=False)
+        if status in (JobStatus.FINISHED, JobStatus.FAILED):
+            return status
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"Job {job.id} did not finish within {timeout}s")
+
+        popped = await async_redis_conn.blpop(
+            [key], timeout=min(remaining, JOB_NOTIFY_CHECK_INTERVAL)
+        )
+        if popped is not None:
+            async with async_redis_conn.pipeline(transaction=False) as pipe:
+                pipe.rpush(key, popped[1])
+                pipe.expire(key, JOB_NOTIFY_EXPIRY)
+                await pipe.execute()
+
+
+def is_retryable(job: Job) -> bool:
+    return job.meta.get("error_kind") not in NON_RETRYABLE_ERRORS
+
+
+async def requeue_job(job: Job) -> None:
+    """Requeue a failed job, tolerating another request sharing it having done so first."""
+    # Drop the failure notice so waiters block until the retry completes
+    await async_redis_conn.delete(notify_key(job.id))
+    try:
+        await run_in_threadpool(job.requeue)
+    except InvalidJobOperation:
+        logger.info(f"Job {job.id} was already requeued")
+
+
+# Cities per batch job: small enough to spread over workers, large enough to amortize job overhead
+BATCH_CITIES_PER_JOB = 10
+
+
+def enqueue_batch(queries: dict, trace: RequestTrace = None) -> str:
+    """Split {city: [months]} into jobs of BATCH_CITIES_PER_JOB cities.
+
+    Fully cached chunks go to the fast queue; the cache check and the enqueue
+    of each cost class are one pipeline each.
+    """
+    batch_id = uuid.uuid4().hex
+    cities = list(queries)
+    chunks = [
+        {city: queries[city] for city in cities[i : i + BATCH_CITIES_PER_JOB]}
+        for i in range(0, len(cities), BATCH_CITIES_PER_JOB)
+    ]
+
+    pipe = redis_conn.pipeline(transaction=False)
+    chunk_keys = []
+    for chunk in chunks:
+        keys = [profile_key(city, month) for city, months in chunk.items() for month in months]
+        chunk_keys.append(keys)
+        pipe.exists(*keys)
+    by_queue = {}
+    for chunk, keys, cached in zip(chunks, chunk_keys, pipe.execute()):
+        name = QUEUE_FAST if cached == len(keys) else QUEUE_SLOW
+        by_queue.setdefault(name, []).append(
+            Queue.prepare_data(
+                "worker.get_profiles_batch",
+                (batch_id, chunk),
+                timeout="10m",
+                meta={"trace": trace.context()} if trace else None,
+            )
+        )
+    for name, jobs in by_queue.items():
+        for job in queues[name].enqueue_many(jobs):
+            if trace:
+                trace.job_ids.append(job.id)
+    logger.info(f"Batch {batch_id}: {len(cities)} cities in {len(chunks)} jobs")
+    return batch_id
+
+
+async def iter_batch_results(batch_id: str, expected: int, timeout: float = JOB_WAIT_TIMEOUT):
+    """Yield per-city result dicts as workers push them; None once `timeout` passes without one."""
+    key = f"batch:{batch_id}"
+    for _ in range(expected):
+        popped = await async_redis_conn.blpop([key], timeout=timeout)
+        if popped is None:
+            yield None
+            return
+        yield json.loads(popped[1])
+    await async_redis_conn.delete(key)
 
-queue = Queue(connection=redis_conn)
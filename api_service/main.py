@@ -1,9 +1,10 @@
 from fastapi import FastAPI
 from app.core.config import lifespan
-from app.api.endpoints import weather, travel, metrics
+from app.api.endpoints import weather, travel, metrics, traces
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(weather.router, prefix="/weather", tags=["weather"])
 app.include_router(travel.router, prefix="/travel", tags=["travel"])
 app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+app.include_router(traces.router, prefix="/traces", tags=["traces"])
@@ -0,0 +1,97 @@
+"""Compare the legacy zlib-JSON cache encoding with shared/codec.py.
+
+Reports encode/decode time and payload size for a profile and a 6-year daily
+series. With --redis it also stores N profiles in both encodings and reports
+Redis MEMORY USAGE per key.
+
+    python bench/codec_benchmark.py [--redis redis://localhost:6379/15] [-n 10000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "shared"))
+from codec import decode_profile, encode_profile  # noqa: E402
+from series_codec import decode_series, encode_series  # noqa: E402
+
+PROFILE = {
+    "city": "London",
+    "month": 7,
+    "min_temp_avg": 13.42,
+    "max_temp_avg": 23.87,
+    "min_temp_std": 2.31,
+    "max_temp_std": 3.05,
+    "min_temp_p10": 10.5,
+    "min_temp_p50": 13.4,
+    "min_temp_p90": 16.3,
+    "max_temp_p10": 19.9,
+    "max_temp_p50": 23.6,
+    "max_temp_p90": 28.1,
+    "updated_at": datetime.now().replace(microsecond=0).isoformat(),
+}
+
+
+def legacy_encode(data) -> bytes:
+    return zlib.compress(json.dumps(data).encode())
+
+
+def legacy_decode(data: bytes):
+    return json.loads(zlib.decompress(data).decode())
+
+
+def daily_series(days: int = 2191) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    seasonal = 12 + 8 * np.sin(np.arange(days) / 365.25 * 2 * np.pi)
+    return np.round(seasonal + rng.normal(0, 2, days), 1)
+
+
+def measure(name, encode, decode, value, number):
+    encoded = encode(value)
+    encode_us = timeit.timeit(lambda: encode(value), number=number) / number * 1e6
+    decode_us = timeit.timeit(lambda: decode(encoded), number=number) / number * 1e6
+    return {"case": name, "bytes": len(encoded), "encode_us": round(encode_us, 2), "decode_us": round(decode_us, 2)}
+
+
+def redis_memory(url: str, count: int):
+    from redis import Redis
+
+    conn = Redis.from_url(url)
+    results = {}
+    for name, encode in (("legacy", legacy_encode), ("v1", encode_profile)):
+        pipe = conn.pipeline(transaction=False)
+        for i in range(count):
+            pipe.set(f"bench:{name}:{i}", encode(dict(PROFILE, month=i % 12 + 1)))
+        pipe.execute()
+        sample = [conn.memory_usage(f"bench:{name}:{i}") for i in range(min(count, 100))]
+        results[name] = round(sum(sample) / len(sample), 1)
+        conn.delete(*[f"bench:{name}:{i}" for i in range(count)])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=10000, help="iterations per timing")
+    parser.add_argument("--redis", help="Redis URL to measure MEMORY USAGE against")
+    args = parser.parse_args()
+
+    series = daily_series()
+    results = [
+        measure("profile legacy", legacy_encode, legacy_decode, PROFILE, args.n),
+        measure("profile v1", encode_profile, decode_profile, PROFILE, args.n),
+        measure("series legacy", lambda v: legacy_encode(v.tolist()), legacy_decode, series, args.n // 100 or 1),
+        measure("series v1", encode_series, decode_series, series, args.n // 100 or 1),
+    ]
+    report = {"results": results}
+    if args.redis:
+        report["redis_bytes_per_key"] = redis_memory(args.redis, args.n)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
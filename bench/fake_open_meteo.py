@@ -0,0 +1,180 @@
+"""Local stand-in for the Open-Meteo geocoding and archive APIs.
+
+Serves /v1/search and /v1/archive on one port with synthetic but stable data,
+so benchmarks run offline and repeatably. Latency, error rate and a global
+rate limit are configurable; GET /stats returns call counters and POST /reset
+clears them.
+
+    python bench/fake_open_meteo.py --port 8090 --latency-ms 80 --error-rate 0.01 --rate-limit 20
+
+Point the workers at it with GEOCODING_URL=http://<host>:8090/v1/search and
+ARCHIVE_URL=http://<host>:8090/v1/archive. Stdlib only.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Names starting with this resolve to nothing, like a misspelled city
+INVALID_PREFIX = "nowhere"
+
+
+def locate(name: str):
+    """Stable pseudo coordinates for any city name."""
+    digest = hashlib.sha1(name.strip().lower().encode()).digest()
+    latitude = round(-55 + digest[0] / 255 * 120, 4)
+    longitude = round(-180 + int.from_bytes(digest[1:3], "big") / 65535 * 360, 4)
+    return latitude, longitude
+
+
+def daily_value(variable: str, latitude: float, day: date) -> float:
+    season = math.sin((day.timetuple().tm_yday - 105) / 365.25 * 2 * math.pi)
+    if latitude < 0:
+        season = -season
+    mean = 28 - abs(latitude) * 0.45 + 9 * season * min(abs(latitude) / 30, 1)
+    noise = ((day.toordinal() * 7919 + int(latitude * 100)) % 61 - 30) / 10
+    if "min" in variable:
+        return round(mean - 5 + noise, 1)
+    if "max" in variable:
+        return round(mean + 5 + noise, 1)
+    if "precipitation" in variable:
+        return round(max(noise, 0), 1)
+    if "humidity" in variable:
+        return round(65 + noise * 3, 1)
+    return round(mean + noise, 1)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeOpenMeteo(BaseHTTPRequestHandler):
+    config = None
+    stats = Counter()
+    stats_lock = threading.Lock()
+    bucket = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def count(self, field: str):
+        with self.stats_lock:
+            self.stats[field] += 1
+
+    def reply(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path == "/reset":
+            with self.stats_lock:
+                self.stats.clear()
+            return self.reply(200, {"ok": True})
+        self.reply(404, {"error": "not found"})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            with self.stats_lock:
+                return self.reply(200, dict(self.stats))
+        if url.path not in ("/v1/search", "/v1/archive"):
+            return self.reply(404, {"error": "not found"})
+
+        kind = "geocoding" if url.path == "/v1/search" else "archive"
+        self.count(kind)
+        if self.bucket and not self.bucket.take():
+            self.count(f"{kind}:429")
+            return self.reply(429, {"error": True, "reason": "Too many requests"}, {"Retry-After": "1"})
+
+        latency = self.config.latency_ms * (1 + self.config.jitter * (2 * random.random() - 1))
+        time.sleep(max(latency, 0) / 1000)
+        if random.random() < self.config.error_rate:
+            self.count(f"{kind}:500")
+            return self.reply(500, {"error": True, "reason": "Injected failure"})
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if kind == "geocoding":
+            return self.reply(200, self.search(params))
+        return self.reply(200, self.archive(params))
+
+    def search(self, params: dict) -> dict:
+        name = params.get("name", "")
+        if not name.strip() or name.strip().lower().startswith(INVALID_PREFIX):
+            return {"generationtime_ms": 0.1}
+        latitude, longitude = locate(name)
+        return {"results": [{"name": name.strip().title(), "latitude": latitude, "longitude": longitude}]}
+
+    def archive(self, params: dict) -> dict:
+        latitude = float(params["latitude"])
+        start = date.fromisoformat(params["start_date"])
+        end = date.fromisoformat(params["end_date"])
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        response = {"latitude": latitude, "longitude": float(params["longitude"])}
+        daily = [name for name in params.get("daily", "").split(",") if name]
+        if daily:
+            response["daily"] = {"time": [day.isoformat() for day in days]}
+            for variable in daily:
+                response["daily"][variable] = [daily_value(variable, latitude, day) for day in days]
+        hourly = [name for name in params.get("hourly", "").split(",") if name]
+        if hourly:
+            response["hourly"] = {
+                "time": [f"{day.isoformat()}T{hour:02d}:00" for day in days for hour in range(24)]
+            }
+            for variable in hourly:
+                response["hourly"][variable] = [
+                    daily_value(variable, latitude, day) for day in days for _ in range(24)
+                ]
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean response latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency +/- this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--rate-limit", type=float, default=0, help="requests/s before 429s, 0 = off")
+    parser.add_argument("--burst", type=float, default=10, help="rate limit burst size")
+    args = parser.parse_args()
+
+    FakeOpenMeteo.config = args
+    if args.rate_limit:
+        FakeOpenMeteo.bucket = TokenBucket(args.rate_limit, args.burst)
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenMeteo)
+    server.daemon_threads = True
+    print(f"Fake Open-Meteo listening on {args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Measure what a worker adds around each job, one short job at a time.
+
+Enqueues cache-hit jobs back to back and, for each, takes the round trip from
+enqueue to the completion notice and the job's own run time (started_at to
+ended_at). The difference is the per-job overhead: dequeue, fork or not,
+module imports in a fresh work horse, teardown, notification.
+
+    WORKER_MODE=fork docker compose up -d worker
+    python bench/job_overhead.py --jobs 300 --output bench/results/fork.json
+    WORKER_MODE=pool docker compose up -d worker
+    python bench/job_overhead.py --jobs 300 --output bench/results/pool.json
+    python bench/job_overhead.py --compare bench/results/fork.json bench/results/pool.json
+
+Run it with a single worker service up so every job goes through the mode
+being measured.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+
+from load_test import git_revision, latency_summary
+
+NOTIFY_TIMEOUT = 60
+
+
+def run_job(queue: Queue, redis_conn, city: str, month: int):
+    """(round trip, job run time) in seconds for one job."""
+    job_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    queue.enqueue("worker.get_monthly_profile", city, month, job_id=job_id)
+    popped = redis_conn.blpop([f"job-done:{job_id}"], timeout=NOTIFY_TIMEOUT)
+    round_trip = time.perf_counter() - started
+    if popped is None:
+        raise SystemExit(f"Job {job_id} did not finish within {NOTIFY_TIMEOUT}s, is a worker running?")
+
+    job = Job.fetch(job_id, connection=redis_conn)
+    if job.get_status() != "finished":
+        raise SystemExit(f"Job {job_id} failed: {job.exc_info}")
+    return round_trip, (job.ended_at - job.started_at).total_seconds()
+
+
+def run(args) -> dict:
+    redis_conn = Redis.from_url(args.redis)
+    queue = Queue(args.queue, connection=redis_conn)
+
+    # The first job computes and caches the city, the rest are cache hits
+    for month in range(1, 13):
+        run_job(queue, redis_conn, args.city, month)
+
+    round_trips, run_times = [], []
+    for index in range(args.jobs):
+        round_trip, run_time = run_job(queue, redis_conn, args.city, index % 12 + 1)
+        round_trips.append(round_trip)
+        run_times.append(run_time)
+    overheads = [round_trip - run_time for round_trip, run_time in zip(round_trips, run_times)]
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "label": args.label,
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "jobs": args.jobs,
+        "round_trip": latency_summary(round_trips),
+        "run_time": latency_summary(run_times),
+        "overhead": latency_summary(overheads),
+    }
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    names = (before.get("label") or before["revision"], after.get("label") or after["revision"])
+    print(f"{'metric':<24}{names[0]:>12}{names[1]:>12}{'change':>10}")
+    for section in ("overhead", "round_trip", "run_time"):
+        for stat in ("mean_ms", "p50_ms", "p99_ms"):
+            old, new = before[section][stat], after[section][stat]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{section + ' ' + stat:<24}{old:>12}{new:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", default="redis://localhost:6379/0")
+    parser.add_argument("--queue", default="fast")
+    parser.add_argument("--city", default="London")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--label", help="name for this run in --compare, e.g. fork or pool")
+    parser.add_argument("--output", help="JSON file to write, default bench/results/overhead-<timestamp>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"overhead-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps({key: report[key] for key in ("round_trip", "run_time", "overhead")}, indent=2))
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Drive the API with a reproducible request mix and record what it cost.
+
+Reports throughput, latency percentiles per endpoint, upstream calls per
+request (from the fake Open-Meteo /stats) and Redis commands per request
+(from INFO commandstats), and saves everything as JSON.
+
+    python bench/load_test.py --requests 2000 --concurrency 32 --output bench/results/run.json
+    python bench/load_test.py --compare bench/results/before.json bench/results/after.json
+
+Redis command counts include everything the server ran during the test,
+workers' background tasks too, so run against an otherwise idle stack.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlencode
+
+import httpx
+from redis import Redis
+
+HOT_CITIES = [
+    "London", "Paris", "New York", "Tokyo", "Berlin", "Madrid", "Rome", "Sydney",
+    "Toronto", "Mumbai", "Cairo", "Lisbon", "Vienna", "Prague", "Dublin", "Oslo",
+]
+ENDPOINTS = ("monthly-profile", "best-month", "compare-cities")
+DEFAULT_MIX = "monthly-profile=5,best-month=3,compare-cities=2"
+PERCENTILES = (50, 90, 99)
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def build_requests(args) -> list:
+    """Deterministic list of (endpoint, path) for the given seed and mix."""
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    hot = HOT_CITIES[: args.hot_cities]
+    cold_counter = 0
+
+    def city():
+        nonlocal cold_counter
+        roll = rng.random()
+        if roll < args.invalid_ratio:
+            return f"Nowhere {rng.randrange(10 ** 6)}"
+        if roll < args.invalid_ratio + args.cold_ratio:
+            cold_counter += 1
+            return f"Coldtown {args.seed}-{cold_counter}"
+        return rng.choice(hot)
+
+    requests = []
+    for _ in range(args.requests):
+        if requests and rng.random() < args.duplicate_ratio:
+            requests.append(requests[-1])
+            continue
+        endpoint = rng.choices(list(mix), weights=list(mix.values()))[0]
+        if endpoint == "monthly-profile":
+            params = {"city": city(), "month": rng.randint(1, 12)}
+            path = "/weather/monthly-profile"
+        elif endpoint == "best-month":
+            low = rng.randint(0, 20)
+            params = {"city": city(), "min_temp": low, "max_temp": low + rng.randint(5, 12)}
+            path = "/travel/best-month"
+        else:
+            cities = list(dict.fromkeys(city() for _ in range(rng.randint(2, 4))))
+            if len(cities) < 2:
+                cities.append(rng.choice([c for c in hot if c not in cities]))
+            params = {"cities": ",".join(cities), "month": rng.randint(1, 12)}
+            path = "/travel/compare-cities"
+        requests.append((endpoint, f"{path}?{urlencode(params)}"))
+    return requests
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(math.ceil(len(ordered) * pct / 100) - 1, 0))]
+
+
+def latency_summary(latencies: list) -> dict:
+    summary = {f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in PERCENTILES}
+    summary["max_ms"] = round(max(latencies) * 1000, 2) if latencies else 0
+    summary["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0
+    return summary
+
+
+def redis_command_counts(redis_conn) -> Counter:
+    stats = redis_conn.info("commandstats")
+    return Counter({name[len("cmdstat_"):]: value["calls"] for name, value in stats.items()})
+
+
+def upstream_stats(client: httpx.Client, fake_url: str) -> Counter:
+    try:
+        return Counter(client.get(f"{fake_url}/stats").json())
+    except httpx.HTTPError:
+        return Counter()
+
+
+async def run_load(api_url: str, requests: list, concurrency: int, timeout: float):
+    results = []
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=timeout, limits=limits) as client:
+        async def send(endpoint: str, path: str):
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                results.append((endpoint, status, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(endpoint, path) for endpoint, path in requests))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    requests = build_requests(args)
+    redis_conn = Redis.from_url(args.redis)
+    sync_client = httpx.Client(timeout=5)
+
+    if args.flush:
+        redis_conn.flushdb()
+    sync_client.post(f"{args.fake}/reset")
+    upstream_before = upstream_stats(sync_client, args.fake)
+    redis_before = redis_command_counts(redis_conn)
+
+    results, elapsed = asyncio.run(run_load(args.api, requests, args.concurrency, args.timeout))
+
+    redis_used = redis_command_counts(redis_conn) - redis_before
+    upstream_used = upstream_stats(sync_client, args.fake) - upstream_before
+    total = len(results)
+
+    by_endpoint = defaultdict(list)
+    statuses = defaultdict(Counter)
+    for endpoint, status, latency in results:
+        by_endpoint[endpoint].append(latency)
+        statuses[endpoint][str(status)] += 1
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+        "latency": latency_summary([latency for _, _, latency in results]),
+        "endpoints": {
+            endpoint: {
+                "requests": len(latencies),
+                "statuses": dict(statuses[endpoint]),
+                **latency_summary(latencies),
+            }
+            for endpoint, latencies in sorted(by_endpoint.items())
+        },
+        "upstream": {
+            "calls": dict(upstream_used),
+            "calls_per_request": round(
+                (upstream_used["geocoding"] + upstream_used["archive"]) / total, 4
+            ) if total else 0,
+        },
+        "redis": {
+            "commands": sum(redis_used.values()),
+            "commands_per_request": round(sum(redis_used.values()) / total, 2) if total else 0,
+            "top_commands": dict(redis_used.most_common(10)),
+        },
+    }
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    rows = [
+        ("throughput_rps", lambda r: r["throughput_rps"]),
+        ("p50_ms", lambda r: r["latency"]["p50_ms"]),
+        ("p99_ms", lambda r: r["latency"]["p99_ms"]),
+        ("upstream calls/request", lambda r: r["upstream"]["calls_per_request"]),
+        ("redis commands/request", lambda r: r["redis"]["commands_per_request"]),
+    ]
+    print(f"{'metric':<26}{before['revision']:>12}{after['revision']:>12}{'change':>10}")
+    for name, get in rows:
+        old, new = get(before), get(after)
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<26}{old:>12}{new:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--fake", default="http://localhost:8090", help="fake Open-Meteo server")
+    parser.add_argument("--redis", default="redis://localhost:6379/0")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights")
+    parser.add_argument("--hot-cities", type=int, default=8, help="size of the popular city pool")
+    parser.add_argument("--cold-ratio", type=float, default=0.05, help="share of never-seen cities")
+    parser.add_argument("--invalid-ratio", type=float, default=0.02, help="share of unknown cities")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="share repeating the previous request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB first to measure a cold start")
+    parser.add_argument("--output", help="JSON file to write, default bench/results/<timestamp>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps({key: report[key] for key in ("throughput_rps", "latency", "upstream", "redis")}, indent=2))
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Experimental delta encoding of daily series, measured by codec_benchmark.py.
+
+Not used by the services: the daily store keeps raw float32 on disk.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+SERIES_V1 = 0x02  # distinct from shared/codec.py's profile version bytes
+FLAG_COMPRESSED = 0x01
+# Only worth paying zlib's header and CPU above this many bytes
+COMPRESS_THRESHOLD = 256
+
+# version, flags, scale, first quantized value, count
+SERIES_HEADER = struct.Struct("<BBHiI")
+SERIES_MISSING = np.iinfo(np.int16).min
+
+
+def encode_series(values, scale: int = 10) -> bytes:
+    """Daily values quantized to 1/scale and delta-encoded as int16.
+
+    Temperatures change slowly from day to day, so deltas are small and
+    compress well; zlib is applied only above COMPRESS_THRESHOLD bytes.
+    NaN days are kept as a sentinel.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    quantized = np.round(values[present] * scale).astype(np.int64)
+    first = int(quantized[0]) if len(quantized) else 0
+
+    # A missing day doesn't break the chain: each present value is stored
+    # relative to the previous present one
+    steps = np.diff(quantized, prepend=first)
+    if np.abs(steps).max(initial=0) >= -SERIES_MISSING:
+        raise ValueError("Series delta out of int16 range, use a smaller scale")
+    deltas = np.full(len(values), SERIES_MISSING, dtype=np.int16)
+    deltas[present] = steps
+
+    payload = deltas.tobytes()
+    flags = 0
+    if len(payload) > COMPRESS_THRESHOLD:
+        payload = zlib.compress(payload)
+        flags |= FLAG_COMPRESSED
+    return SERIES_HEADER.pack(SERIES_V1, flags, scale, first, len(values)) + payload
+
+
+def decode_series(data: bytes) -> np.ndarray:
+    version, flags, scale, first, count = SERIES_HEADER.unpack_from(data)
+    if version != SERIES_V1:
+        raise ValueError(f"Unknown series encoding version {version}")
+
+    payload = data[SERIES_HEADER.size :]
+    if flags & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    deltas = np.frombuffer(payload, dtype=np.int16, count=count)
+
+    missing = deltas == SERIES_MISSING
+    steps = np.where(missing, 0, deltas).astype(np.int64)
+    quantized = first + np.cumsum(steps)
+    values = quantized / scale
+    values[missing] = np.nan
+    return values
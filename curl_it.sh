@@ -15,6 +15,18 @@ echo "-----------------------------"
 curl -X GET "http://localhost:8000/travel/compare-cities?cities=New%20York,Tokyo,Sydney&month=4"
 echo -e "\n"
 
+echo "Testing Best Destinations Endpoint"
+echo "----------------------------------"
+curl -X GET "http://localhost:8000/travel/best-destinations?min_temp=15&max_temp=25&limit=5"
+echo -e "\n"
+
+echo "Testing Batch Profiles Endpoint"
+echo "-------------------------------"
+curl -X POST "http://localhost:8000/weather/profiles" \
+  -H "Content-Type: application/json" \
+  -d '{"queries": [{"city": "London", "months": [6, 7, 8]}, {"city": "Paris"}]}'
+echo -e "\n"
+
 echo "Testing Metrics Endpoint"
 echo "----------------------"
 curl -X GET "http://localhost:8000/metrics"
@@ -1,28 +1,171 @@
 from fastapi import FastAPI
 from redis import Redis
-import statistics
+import math
+import time
+from datetime import datetime
+
+from histogram import HISTOGRAM_BUCKETS, METRICS_SERIES_KEY, METRICS_SLOT_SECONDS, bucket_upper_bound, histogram_key
 
 app = FastAPI()
 redis_conn = Redis(host='redis')
 
+RQ_QUEUES_KEY = "rq:queues"
+RQ_QUEUE_PREFIX = "rq:queue:"
+# Circuit breakers, written by worker_service/upstream.py
+BREAKER_HOSTS_KEY = "breaker:hosts"
+
+# Rollup name -> number of complete minute slots, the one still filling is left out
+WINDOWS = {"1m": 1, "5m": 5, "1h": 60}
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_lower_bound(index: int) -> float:
+    return 0.0 if index == 0 else bucket_upper_bound(index - 1)
+
+
+class MergedHistogram:
+    """Sum of per-process, per-minute histograms for one series."""
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def add(self, fields: dict):
+        for field, value in fields.items():
+            field = field.decode()
+            if field.startswith("b"):
+                self.counts[int(field[1:])] += int(value)
+            elif field == "count":
+                self.count += int(value)
+            elif field == "errors":
+                self.errors += int(value)
+            elif field == "sum":
+                self.total += float(value)
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {
+                "hits": 0, "errors": 0, "avg_time": 0, "max_time": 0, "min_time": 0,
+                **{f"p{str(pct).replace('.', '')}_time": 0 for pct in PERCENTILES},
+            }
+
+        occupied = [index for index, count in enumerate(self.counts) if count]
+        ranks = sorted((math.ceil(self.count * pct / 100), pct) for pct in PERCENTILES)
+        percentiles = {}
+        seen = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            while position < len(ranks) and seen >= ranks[position][0]:
+                percentiles[ranks[position][1]] = bucket_upper_bound(index)
+                position += 1
+
+        return {
+            "hits": self.count,
+            "errors": self.errors,
+            "avg_time": round(self.total / self.count, 4),
+            # Exact extremes aren't mergeable, report the enclosing bucket edges
+            "max_time": round(bucket_upper_bound(occupied[-1]), 4),
+            "min_time": round(bucket_lower_bound(occupied[0]), 4),
+            **{
+                f"p{str(pct).replace('.', '')}_time": round(value, 4)
+                for pct, value in percentiles.items()
+            },
+        }
+
+
+def rollups(series: list) -> dict:
+    """{series: {window: summary}} merged across every process, in one pipeline.
+
+    Windows end at the last complete minute, so "1m" isn't near empty right
+    after a minute boundary.
+    """
+    now_slot = int(time.time() // METRICS_SLOT_SECONDS)
+    longest = max(WINDOWS.values())
+
+    pipe = redis_conn.pipeline(transaction=False)
+    for name in series:
+        for age in range(1, longest + 1):
+            pipe.hgetall(histogram_key(name, now_slot - age))
+    results = iter(pipe.execute())
+
+    merged = {}
+    for name in series:
+        histogram = MergedHistogram()
+        windows = {}
+        # Newest slot first, snapshotting each window as it fills
+        for age in range(1, longest + 1):
+            histogram.add(next(results))
+            for window, slots in WINDOWS.items():
+                if slots == age:
+                    windows[window] = histogram.summary()
+        merged[name] = windows
+    return merged
+
+
+def queue_depths() -> dict:
+    """{queue name: jobs waiting} for every RQ queue, in one pipeline."""
+    names = sorted(
+        key.decode()[len(RQ_QUEUE_PREFIX):] for key in redis_conn.smembers(RQ_QUEUES_KEY)
+    )
+    pipe = redis_conn.pipeline(transaction=False)
+    for name in names:
+        pipe.llen(f"{RQ_QUEUE_PREFIX}{name}")
+    return dict(zip(names, pipe.execute()))
+
+
+def breaker_states() -> dict:
+    """{upstream host: circuit breaker state} for every host that has ever failed."""
+    hosts = sorted(host.decode() for host in redis_conn.smembers(BREAKER_HOSTS_KEY))
+    pipe = redis_conn.pipeline(transaction=False)
+    for host in hosts:
+        pipe.hgetall(f"breaker:{host}")
+    breakers = {}
+    for host, fields in zip(hosts, pipe.execute()):
+        fields = {key.decode(): value.decode() for key, value in fields.items()}
+        opened_at = int(fields.get("opened_at", 0))
+        breakers[host] = {
+            "state": fields.get("state", "closed"),
+            "consecutive_failures": int(fields.get("failures", 0)),
+            "times_opened": int(fields.get("opens", 0)),
+            "last_opened_at": datetime.fromtimestamp(opened_at / 1000).isoformat() if opened_at else None,
+        }
+    return breakers
+
+
 @app.get("/metrics")
 async def get_metrics():
-    metrics = {
-        "/weather/monthly-profile": redis_conn.hgetall("metrics:monthly-profile"),
-        "/travel/best-month": redis_conn.hgetall("metrics:best-month"),
-        "/travel/compare-cities": redis_conn.hgetall("metrics:compare-cities")
-    }
-    
+    series = sorted(member.decode() for member in redis_conn.smembers(METRICS_SERIES_KEY))
+    merged = rollups(series)
+
+    cache_stats = {}
+    for field, count in redis_conn.hgetall("metrics:cache").items():
+        tier, outcome = field.decode().split(":", 1)
+        cache_stats.setdefault(tier, {"hit": 0, "miss": 0, "stale": 0})[outcome] = int(count)
+
+    routes = {}
+    jobs = {}
+    stages = {}
+    queues = {name: {"depth": depth, "wait": {}} for name, depth in queue_depths().items()}
+    for name, windows in merged.items():
+        kind, _, label = name.partition(":")
+        if kind == "route":
+            routes[label] = {"route_name": label, **windows["1h"], "windows": windows}
+        elif kind == "queue":
+            queues.setdefault(label, {"depth": 0})["wait"] = windows
+        elif kind == "stage":
+            # Time per request (api.*) or per job spent in each traced stage
+            stages[label] = windows
+        else:
+            jobs[name] = windows
+
     return {
-        "routes": {
-            route: {
-                "route_name": route,
-                "hits": int(data.get(b"hits", 0)),
-                "errors": int(data.get(b"errors", 0)),
-                "avg_time": float(data.get(b"avg_time", 0)),
-                "max_time": float(data.get(b"max_time", 0)),
-                "min_time": float(data.get(b"min_time", 0))
-            }
-            for route, data in metrics.items()
-        }
+        "cache": cache_stats,
+        "routes": routes,
+        "jobs": jobs,
+        "queues": queues,
+        "stages": stages,
+        "upstream": breaker_states(),
     }
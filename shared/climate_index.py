@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from redis import WatchError
+
+from codec import decode_profile
+from profile_policy import PROFILE_HARD_TTL
+
+logger = logging.getLogger("climate_index")
+
+POINTS_KEY = "climate-index:points"  # hash of profile key -> "city\tmonth\tmin_avg\tmax_avg"
+UPDATES_KEY = "climate-index:updates"  # sorted set of profile key -> last write (ms)
+# Sorted set of profile key -> last write (ms), never trimmed: points whose
+# profile reached PROFILE_HARD_TTL without a rewrite are dropped with it
+WRITTEN_KEY = "climate-index:written"
+# How often add() and sync() look for expired points
+EXPIRY_CHECK_INTERVAL = 60
+# Updates older than this are trimmed; a process that fell further behind reloads
+UPDATES_RETENTION = 86400
+# Tolerated clock skew between the processes writing and reading updates
+SYNC_OVERLAP_MS = 5000
+PROFILE_KEY_PATTERN = "weather:*"
+BACKFILL_BATCH = 1000
+
+
+class ClimateIndexPublisher:
+    """Writes points of cached profiles to the shared index, without holding any.
+
+    What the workers use: they publish as they cache profiles, the API
+    searches (ClimateIndex). Points of profiles that expired are dropped
+    from Redis every EXPIRY_CHECK_INTERVAL.
+    """
+
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+        self._expired_at = 0
+
+    def add(self, profiles: dict) -> dict:
+        """Publish {profile key: profile}; returns the points written."""
+        points = {key: self._format(profile) for key, profile in profiles.items() if profile}
+        if not points:
+            return {}
+        now = int(time.time() * 1000)
+        pipe = self.redis_conn.pipeline(transaction=False)
+        pipe.hset(POINTS_KEY, mapping=points)
+        pipe.zadd(UPDATES_KEY, {key: now for key in points})
+        pipe.zadd(WRITTEN_KEY, {key: now for key in points})
+        pipe.zremrangebyscore(UPDATES_KEY, "-inf", now - UPDATES_RETENTION * 1000)
+        pipe.execute()
+        if now - self._expired_at > EXPIRY_CHECK_INTERVAL * 1000:
+            self._expire(now)
+        return points
+
+    def _expire(self, now: int):
+        """Drop points not rewritten within PROFILE_HARD_TTL, their profile is gone."""
+        self._expired_at = now
+        cutoff = now - PROFILE_HARD_TTL * 1000
+        with self.redis_conn.pipeline() as pipe:
+            try:
+                pipe.watch(WRITTEN_KEY)
+                stale = pipe.zrangebyscore(WRITTEN_KEY, "-inf", f"({cutoff}")
+                if not stale:
+                    return
+                pipe.multi()
+                pipe.hdel(POINTS_KEY, *stale)
+                pipe.zrem(WRITTEN_KEY, *stale)
+                pipe.execute()
+                logger.info(f"Dropped {len(stale)} expired points from the climate index")
+            except WatchError:
+                pass  # a point was just written, retried on the next check
+
+    @staticmethod
+    def _format(profile: dict) -> str:
+        return f"{profile['city']}\t{profile['month']}\t{profile['min_temp_avg']}\t{profile['max_temp_avg']}"
+
+    @staticmethod
+    def _parse(value) -> tuple:
+        if isinstance(value, bytes):
+            value = value.decode()
+        city, month, min_avg, max_avg = value.split("\t")
+        return city, int(month), float(min_avg), float(max_avg)
+
+
+class ClimateIndex(ClimateIndexPublisher):
+    """Average min/max temperature of every cached (city, month), searchable in memory.
+
+    Points live in a Redis hash so a process loads them with one HGETALL, and
+    every write is stamped in a sorted set so other processes pick up changes
+    incrementally with sync().
+    """
+
+    def __init__(self, redis_conn):
+        super().__init__(redis_conn)
+        self._points = {}
+        self._written = {}  # profile key -> last write (ms)
+        self._arrays = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def load(self):
+        """Replace the in-memory points with everything in Redis."""
+        started = int(time.time() * 1000)
+        raw = self.redis_conn.hgetall(POINTS_KEY)
+        if not raw:
+            raw = self._backfill()
+        points = {key.decode(): self._parse(value) for key, value in raw.items()}
+        written = {
+            key.decode(): int(score)
+            for key, score in self.redis_conn.zrange(WRITTEN_KEY, 0, -1, withscores=True)
+        }
+        # Points indexed before writes were stamped expire a hard TTL from now at the latest
+        unstamped = {key: started for key in points if key not in written}
+        if unstamped:
+            self.redis_conn.zadd(WRITTEN_KEY, unstamped, nx=True)
+            written.update(unstamped)
+        with self._lock:
+            self._points = points
+            self._written = {key: written[key] for key in points}
+            self._arrays = None
+            self._synced_at = started
+        self._expire(started)
+        logger.info(f"Loaded {len(self._points)} points into the climate index")
+
+    def _backfill(self) -> dict:
+        """Build the hash from profiles cached before the index existed."""
+        keys = [
+            key for key in self.redis_conn.scan_iter(match=PROFILE_KEY_PATTERN, count=BACKFILL_BATCH)
+            if key.rsplit(b":", 1)[-1].isdigit()
+        ]
+        profiles = {}
+        for offset in range(0, len(keys), BACKFILL_BATCH):
+            batch = keys[offset : offset + BACKFILL_BATCH]
+            for key, value in zip(batch, self.redis_conn.mget(batch)):
+                if value is not None:
+                    profiles[key.decode()] = decode_profile(value)
+        if profiles:
+            self.add(profiles)
+        return {key.encode(): self._format(profile) for key, profile in profiles.items()}
+
+    def sync(self):
+        """Apply points written by other processes since the last load or sync,
+        and drop the ones whose profile expired."""
+        now = int(time.time() * 1000)
+        if now - self._synced_at > UPDATES_RETENTION * 1000:
+            self.load()
+            return
+        since = self._synced_at - SYNC_OVERLAP_MS
+        updates = self.redis_conn.zrangebyscore(UPDATES_KEY, since, "+inf", withscores=True)
+        if updates:
+            values = self.redis_conn.hmget(POINTS_KEY, [key for key, _ in updates])
+            with self._lock:
+                for (key, written_at), value in zip(updates, values):
+                    if value is not None:
+                        self._points[key.decode()] = self._parse(value)
+                        self._written[key.decode()] = int(written_at)
+                self._arrays = None
+        self._synced_at = now
+        if now - self._expired_at > EXPIRY_CHECK_INTERVAL * 1000:
+            self._expire(now)
+
+    def _expire(self, now: int):
+        cutoff = now - PROFILE_HARD_TTL * 1000
+        with self._lock:
+            expired = [key for key, written_at in self._written.items() if written_at < cutoff]
+            for key in expired:
+                self._points.pop(key, None)
+                del self._written[key]
+            if expired:
+                self._arrays = None
+        # Every process removes its own copy, whoever gets here first cleans up Redis
+        super()._expire(now)
+
+    def add(self, profiles: dict) -> dict:
+        """Publish {profile key: profile} and index the points locally."""
+        points = super().add(profiles)
+        now = int(time.time() * 1000)
+        with self._lock:
+            for key, value in points.items():
+                self._points[key] = self._parse(value)
+                self._written[key] = now
+            self._arrays = None
+        return points
+
+    def nearest(self, min_temp: float, max_temp: float, k: int = 10) -> list:
+        """Top k (city, month) points by the find_best_month score, best first."""
+        cities, months, min_avg, max_avg = self._get_arrays()
+        if not len(cities):
+            return []
+        # Same score as aggregation.score_months
+        min_diff = np.abs(min_avg - min_temp)
+        max_diff = np.abs(max_avg - max_temp)
+        overall = min_diff + max_diff
+        k = min(k, len(overall))
+        top = np.argpartition(overall, k - 1)[:k]
+        top = top[np.argsort(overall[top], kind="stable")]
+        return [
+            {
+                "city": cities[i],
+                "month": int(months[i]),
+                "min_temp_avg": round(float(min_avg[i]), 2),
+                "max_temp_avg": round(float(max_avg[i]), 2),
+                "min_temp_diff": round(float(min_diff[i]), 2),
+                "max_temp_diff": round(float(max_diff[i]), 2),
+                "overall_diff": round(float(overall[i]), 2),
+            }
+            for i in top
+        ]
+
+    def _get_arrays(self):
+        # Rebuilt lazily after writes, so bursts of add() don't each pay for it
+        with self._lock:
+            if self._arrays is None:
+                points = list(self._points.values())
+                self._arrays = (
+                    [point[0] for point in points],
+                    np.array([point[1] for point in points], dtype=np.int8),
+                    np.array([point[2] for point in points], dtype=np.float64),
+                    np.array([point[3] for point in points], dtype=np.float64),
+                )
+            return self._arrays
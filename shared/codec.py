@@ -0,0 +1,85 @@
+import json
+import math
+import struct
+import zlib
+from datetime import datetime
+
+# Leading byte of every encoded value. Legacy entries are zlib streams, which
+# always start with 0x78, so the two formats can't be confused.
+PROFILE_V1 = 0x01
+# 0x02 is taken by the experimental series format in bench/series_codec.py
+# v1 followed by named fields of the opt-in variables (precip_avg, hourly_temp_p90...)
+PROFILE_V2 = 0x03
+LEGACY_ZLIB = 0x78
+
+# Fixed float layout of a profile, NaN marks a field the profile doesn't have
+PROFILE_FIELDS = (
+    "min_temp_avg", "max_temp_avg",
+    "min_temp_std", "max_temp_std",
+    "min_temp_p10", "min_temp_p50", "min_temp_p90",
+    "max_temp_p10", "max_temp_p50", "max_temp_p90",
+)
+# version, month, updated_at (epoch seconds), city name length
+PROFILE_HEADER = struct.Struct("<BBIB")
+PROFILE_VALUES = struct.Struct(f"<{len(PROFILE_FIELDS)}f")
+PROFILE_META_FIELDS = ("city", "month", "updated_at")
+# v2 extra field: name length, name, then one float
+EXTRA_FIELD_VALUE = struct.Struct("<f")
+
+def encode_profile(profile: dict) -> bytes:
+    city = profile["city"].encode()[:255]
+    updated_at = profile.get("updated_at")
+    timestamp = int(datetime.fromisoformat(updated_at).timestamp()) if updated_at else 0
+    values = [float(profile.get(field, math.nan)) for field in PROFILE_FIELDS]
+    extra = [
+        field for field in profile
+        if field not in PROFILE_FIELDS and field not in PROFILE_META_FIELDS
+    ][:255]
+    encoded = (
+        PROFILE_HEADER.pack(PROFILE_V2 if extra else PROFILE_V1, profile["month"], timestamp, len(city))
+        + city
+        + PROFILE_VALUES.pack(*values)
+    )
+    if not extra:
+        return encoded
+    parts = [encoded, bytes([len(extra)])]
+    for field in extra:
+        name = field.encode()[:255]
+        parts += [bytes([len(name)]), name, EXTRA_FIELD_VALUE.pack(float(profile[field]))]
+    return b"".join(parts)
+
+
+def decode_profile(data: bytes) -> dict:
+    if data[0] == LEGACY_ZLIB:
+        return json.loads(zlib.decompress(data).decode())
+    if data[0] not in (PROFILE_V1, PROFILE_V2):
+        raise ValueError(f"Unknown profile encoding version {data[0]}")
+
+    _, month, timestamp, city_length = PROFILE_HEADER.unpack_from(data)
+    offset = PROFILE_HEADER.size
+    city = data[offset : offset + city_length].decode()
+    offset += city_length
+    values = PROFILE_VALUES.unpack_from(data, offset)
+    offset += PROFILE_VALUES.size
+
+    profile = {"city": city, "month": month}
+    for field, value in zip(PROFILE_FIELDS, values):
+        if not math.isnan(value):
+            # Profiles are rounded to 2 decimals, float32 keeps that exactly
+            profile[field] = round(value, 2)
+    if data[0] == PROFILE_V2:
+        profile.update(decode_extra_fields(data, offset))
+    if timestamp:
+        profile["updated_at"] = datetime.fromtimestamp(timestamp).isoformat()
+    return profile
+
+
+def decode_extra_fields(data: bytes, offset: int) -> dict:
+    fields = {}
+    for _ in range(data[offset]):
+        length = data[offset + 1]
+        name = data[offset + 2 : offset + 2 + length].decode()
+        (value,) = EXTRA_FIELD_VALUE.unpack_from(data, offset + 2 + length)
+        fields[name] = round(value, 2)
+        offset += 1 + length + EXTRA_FIELD_VALUE.size
+    return fields
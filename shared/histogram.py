@@ -0,0 +1,30 @@
+import math
+
+# Layout of the per-minute latency histograms the API and workers write and
+# metrics_service merges: log-scale buckets from 0.1ms to ~28h, 8 per doubling
+# (~9% relative error)
+HISTOGRAM_MIN = 0.0001
+HISTOGRAM_BUCKETS_PER_DOUBLING = 8
+HISTOGRAM_BUCKETS = 30 * HISTOGRAM_BUCKETS_PER_DOUBLING
+_LOG_FACTOR = math.log(2) / HISTOGRAM_BUCKETS_PER_DOUBLING
+
+# Fleet-wide samples: metrics:hist:<series>:<minute> hashes of b<index>,
+# count, errors & sum, every series listed in METRICS_SERIES_KEY
+METRICS_SLOT_SECONDS = 60
+METRICS_RETENTION = 2 * 3600
+METRICS_SERIES_KEY = "metrics:series"
+
+
+def histogram_key(series: str, slot: int) -> str:
+    return f"metrics:hist:{series}:{slot}"
+
+
+def bucket_index(value: float) -> int:
+    if value <= HISTOGRAM_MIN:
+        return 0
+    index = int(math.log(value / HISTOGRAM_MIN) / _LOG_FACTOR)
+    return min(index, HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index: int) -> float:
+    return HISTOGRAM_MIN * math.exp((index + 1) * _LOG_FACTOR)
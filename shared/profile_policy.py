@@ -0,0 +1,30 @@
+from datetime import datetime
+
+# Cache keys and freshness rules of monthly profiles, shared by the workers
+# (which compute and cache them) and the API (which reads them directly).
+
+# Profiles older than the soft TTL are still served but trigger a refresh,
+# Redis drops them at the hard TTL.
+PROFILE_SOFT_TTL = 86400 * 7  # 7 days
+PROFILE_HARD_TTL = 86400 * 30  # 30 days
+REFRESH_LOCK_TTL = 600  # one background refresh per city per 10 minutes
+REFRESH_QUEUE = "background"
+REFRESH_JOB = "worker.refresh_city"
+
+
+def profile_key(city: str, month) -> str:
+    """Redis key of a city's monthly profile."""
+    return f"weather:{city.strip().lower()}:{month}"
+
+
+def refresh_lock_key(city: str) -> str:
+    return f"refreshing:{city.strip().lower()}"
+
+
+def is_stale(profile: dict, soft_ttl: float = PROFILE_SOFT_TTL, ahead: float = 0) -> bool:
+    """Past the soft TTL, or within `ahead` seconds of it."""
+    updated_at = profile.get("updated_at")
+    if not updated_at:
+        return True
+    age = datetime.now() - datetime.fromisoformat(updated_at)
+    return age.total_seconds() + ahead > soft_ttl
@@ -0,0 +1,124 @@
+import numpy as np
+
+PERCENTILES = (10, 50, 90)
+
+
+def month_numbers(dates: np.ndarray) -> np.ndarray:
+    """Month (1-12) of each datetime64[D] date."""
+    return dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+
+def monthly_stats(dates: np.ndarray, values: np.ndarray, percentiles=PERCENTILES) -> dict:
+    """Per-month count, mean, std and percentiles of a daily series in one pass.
+
+    Every returned array has 12 rows, one per month; percentiles has one column
+    per requested percentile. Missing days (NaN) are ignored and months without
+    data come back as NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    months = month_numbers(dates)[valid] - 1
+    values = values[valid]
+
+    counts = np.bincount(months, minlength=12)
+    sums = np.bincount(months, weights=values, minlength=12)
+    squares = np.bincount(months, weights=values * values, minlength=12)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts
+        variance = np.maximum(squares / counts - mean * mean, 0.0)
+    std = np.sqrt(variance)
+
+    # Sort by month, then value, so each month is a contiguous sorted run
+    order = np.lexsort((values, months))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    q = np.asarray(percentiles, dtype=np.float64) / 100.0
+    # Linear interpolation between closest ranks, same as np.percentile's default
+    positions = starts[:, None] + (np.maximum(counts, 1)[:, None] - 1) * q[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    if len(ordered):
+        lower = np.minimum(lower, len(ordered) - 1)
+        upper = np.minimum(upper, len(ordered) - 1)
+        fraction = positions - np.floor(positions)
+        pct = ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+    else:
+        pct = np.zeros(positions.shape)
+    pct[counts == 0] = np.nan
+
+    return {"count": counts, "mean": mean, "std": std, "percentiles": pct}
+
+
+def monthly_aggregates(dates: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """(12, 5) running aggregates of a series: count, sum, sum of squares, min, max per month.
+
+    Aggregates of disjoint date ranges combine with merge_aggregates, so new
+    days can be folded in without reading the old ones again. Months without
+    data have count 0, min +inf and max -inf.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    months = month_numbers(dates)[valid] - 1
+    values = values[valid]
+
+    aggregates = np.empty((12, 5))
+    aggregates[:, 0] = np.bincount(months, minlength=12)
+    aggregates[:, 1] = np.bincount(months, weights=values, minlength=12)
+    aggregates[:, 2] = np.bincount(months, weights=values * values, minlength=12)
+    aggregates[:, 3] = np.inf
+    aggregates[:, 4] = -np.inf
+    np.minimum.at(aggregates[:, 3], months, values)
+    np.maximum.at(aggregates[:, 4], months, values)
+    return aggregates
+
+
+def merge_aggregates(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    merged = first[:, :3] + second[:, :3]
+    return np.column_stack((
+        merged,
+        np.minimum(first[:, 3], second[:, 3]),
+        np.maximum(first[:, 4], second[:, 4]),
+    ))
+
+
+def aggregate_mean_std(aggregates: np.ndarray):
+    """Per-month mean and std from running aggregates, NaN for months without data.
+
+    Same population std as monthly_stats.
+    """
+    counts, sums, squares = aggregates[:, 0], aggregates[:, 1], aggregates[:, 2]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts
+        variance = np.maximum(squares / counts - mean * mean, 0.0)
+    return mean, np.sqrt(variance)
+
+
+def score_months(min_avg, max_avg, min_temp: float, max_temp: float):
+    """Distance of monthly averages to a (min_temp, max_temp) target.
+
+    Works on any shape, e.g. (12,) for one city or (cities, 12) for many.
+    Returns (min_diff, max_diff, overall_diff) arrays.
+    """
+    min_diff = np.abs(np.asarray(min_avg, dtype=np.float64) - min_temp)
+    max_diff = np.abs(np.asarray(max_avg, dtype=np.float64) - max_temp)
+    return min_diff, max_diff, min_diff + max_diff
+
+
+def best_month(min_avg, max_avg, min_temp: float, max_temp: float):
+    """Index of the best scoring month in each row, plus the three diff arrays."""
+    min_diff, max_diff, overall = score_months(min_avg, max_avg, min_temp, max_temp)
+    # Months without data never win
+    overall = np.where(np.isnan(overall), np.inf, overall)
+    return np.argmin(overall, axis=-1), min_diff, max_diff, overall
+
+
+def profile_matrix(profiles_by_city: dict, field: str) -> np.ndarray:
+    """Stack {city: [12 monthly profiles]} into a (cities, 12) array of `field`."""
+    return np.array(
+        [
+            [profile[field] if profile else np.nan for profile in profiles]
+            for profiles in profiles_by_city.values()
+        ],
+        dtype=np.float64,
+    )
@@ -0,0 +1,173 @@
+import json
+import re
+from array import array
+
+import numpy as np
+
+# Bytes handed to the decoder at a time; with the unconsumed tail of the
+# previous chunk this bounds the decoder's buffer
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = b" \t\r\n"
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+_LITERAL = re.compile(rb'[^,:\[\]{}\s"]+')
+
+
+class _Values:
+    """Growable float32 column, filled from comma separated JSON numbers."""
+
+    def __init__(self):
+        self.data = array("f")
+
+    def extend(self, text: bytes):
+        # Open-Meteo sends null for hours/days it has no reading for
+        values = np.array(text.replace(b"null", b"nan").split(b","), dtype=np.float32)
+        self.data.frombytes(values.tobytes())
+
+    def finish(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype=np.float32)
+
+
+class _Times:
+    """Growable column of minutes since 1970, from ISO strings or unix seconds."""
+
+    def __init__(self):
+        self.data = array("q")
+
+    def extend(self, text: bytes):
+        if text.startswith(b'"'):
+            minutes = np.array(text.replace(b'"', b"").split(b",")).astype("datetime64[m]")
+        else:
+            minutes = np.array(text.split(b","), dtype=np.int64) // 60
+        self.data.frombytes(minutes.astype(np.int64).tobytes())
+
+    def finish(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype=np.int64).astype("datetime64[m]")
+
+
+class ArchiveDecoder:
+    """Incremental decoder of an Open-Meteo archive response.
+
+    Fed the body chunk by chunk, it decodes the requested `daily`/`hourly`
+    arrays straight into typed arrays (float32 values, datetime64 times), one
+    chunk's worth of values at a time, so memory beyond the result stays
+    around one chunk in size. Other arrays are skipped as they stream by; top-level
+    scalars such as `error` and `reason` are kept.
+
+        decoder = ArchiveDecoder({"daily": ("temperature_2m_max",)})
+        for chunk in chunks:
+            decoder.feed(chunk)
+        data = decoder.close()  # {"daily": {"time": ..., "temperature_2m_max": ...}, ...}
+    """
+
+    def __init__(self, sections: dict):
+        self.sections = {section: set(variables) for section, variables in sections.items()}
+        self.scalars = {}
+        self.columns = {}
+        self._buffer = b""
+        # One [is_object, key, expecting_key] frame per open container
+        self._stack = []
+        self._array = None  # (section, column or None) while inside a section's array
+        self._done = False
+
+    def feed(self, chunk: bytes):
+        self._buffer += chunk
+        position = self._parse(self._buffer)
+        self._buffer = self._buffer[position:]
+
+    def close(self) -> dict:
+        """Everything decoded, raises ValueError if the body was cut short or isn't JSON."""
+        self._buffer = self._buffer[self._parse(self._buffer, final=True):]
+        if not self._done or self._stack or self._buffer.strip(_WHITESPACE):
+            raise ValueError("Truncated or malformed archive response")
+
+        data = dict(self.scalars)
+        for (section, name), column in self.columns.items():
+            data.setdefault(section, {})[name] = column.finish()
+        return data
+
+    def _parse(self, buffer: bytes, final: bool = False) -> int:
+        position, end = 0, len(buffer)
+        while position < end:
+            if self._array is not None:
+                consumed = self._consume_array(buffer, position)
+                if consumed == position:
+                    break
+                position = consumed
+                continue
+
+            char = buffer[position : position + 1]
+            if char in _WHITESPACE:
+                position += 1
+            elif char in b"{[":
+                self._open(char == b"{")
+                position += 1
+            elif char in b"}]":
+                self._stack.pop()
+                self._done = not self._stack
+                position += 1
+            elif char == b",":
+                if self._stack and self._stack[-1][0]:
+                    self._stack[-1][2] = True
+                position += 1
+            elif char == b":":
+                position += 1
+            else:
+                match = (_STRING if char == b'"' else _LITERAL).match(buffer, position)
+                if match is None:
+                    if char != b'"':
+                        raise ValueError(f"Unexpected {char!r} in archive response")
+                    break  # string continues in the next chunk
+                if match.end() == end and char != b'"' and not final:
+                    break  # number or literal may continue in the next chunk
+                self._token(match.group())
+                position = match.end()
+        return position
+
+    def _open(self, is_object: bool):
+        # Section arrays sit at {"<section>": {"<name>": [...]}}
+        in_section = (
+            not is_object
+            and len(self._stack) == 2
+            and self._stack[0][0]
+            and self._stack[1][0]
+            and self._stack[0][1] in self.sections
+        )
+        section, name = (self._stack[0][1], self._stack[1][1]) if in_section else (None, None)
+        self._stack.append([is_object, None, is_object])
+        if not in_section:
+            return
+        column = None
+        if name in self.sections[section] or name == "time":
+            column = self.columns[(section, name)] = _Times() if name == "time" else _Values()
+        self._array = (section, column)
+
+    def _token(self, token: bytes):
+        frame = self._stack[-1] if self._stack else None
+        if frame is not None and frame[0] and frame[2]:
+            frame[1] = json.loads(token)
+            frame[2] = False
+        elif frame is None:
+            raise ValueError("Archive response is not a JSON object")
+        elif len(self._stack) == 1 and frame[0]:
+            self.scalars[frame[1]] = json.loads(token)
+
+    def _consume_array(self, buffer: bytes, position: int) -> int:
+        """Decode the section array up to its end or the last complete element."""
+        _, column = self._array
+        close = buffer.find(b"]", position)
+        if close == -1:
+            cut = buffer.rfind(b",", position)
+            if cut == -1:
+                return position
+            text = buffer[position:cut].translate(None, _WHITESPACE)
+            if column is not None and text:
+                column.extend(text)
+            return cut + 1
+
+        text = buffer[position:close].translate(None, _WHITESPACE)
+        if column is not None and text:
+            column.extend(text)
+        self._array = None
+        self._stack.pop()
+        return close + 1
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from redis import asyncio as aioredis
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.timeouts import TimerDeathPenalty
+from rq.utils import utcnow
+
+import worker
+from logger import setup_logger
+
+logger = setup_logger("async_worker")
+
+# Jobs one process runs at the same time
+ASYNC_WORKER_CONCURRENCY = int(os.getenv("ASYNC_WORKER_CONCURRENCY", "32"))
+# Seconds a BLPOP waits, also how quickly a stop request is noticed
+DEQUEUE_TIMEOUT = 5
+HEARTBEAT_INTERVAL = 60
+# Running jobs are kept in StartedJobRegistry this long past each heartbeat
+JOB_HEARTBEAT_TTL = HEARTBEAT_INTERVAL + 60
+# A job holds one connection at a time, plus one per thread of its own pool
+REDIS_CONNECTIONS_PER_JOB = worker.MAX_WORKERS + 1
+
+
+class AsyncWorker(worker.NotifyingWorker):
+    """Runs up to `concurrency` jobs at once from the same RQ queues.
+
+    The event loop owns the queue: it BLPOPs job ids over async Redis whenever
+    a slot is free and sends worker heartbeats. Job functions are the same sync
+    code the forking worker runs, executed on a pool of `concurrency` threads.
+    Their upstream calls already go through the process-wide async HTTP/2
+    client, so a thread waiting on Open-Meteo costs no CPU while others run.
+    Job state, results and completion notices go through the usual RQ and
+    NotifyingWorker code paths, so the API can't tell the two modes apart.
+
+    The worker hash only has room for one current job, so with several in
+    flight it is left out; running jobs are tracked here and kept alive in
+    StartedJobRegistry by the heartbeat task instead.
+    """
+
+    # Signal based timeouts only work on the main thread
+    death_penalty_class = TimerDeathPenalty
+
+    def __init__(self, queues, concurrency: int = ASYNC_WORKER_CONCURRENCY, **kwargs):
+        super().__init__(queues, **kwargs)
+        self.concurrency = concurrency
+        # The shared pool is sized for one job per process, grow it so jobs don't
+        # fail with "Too many connections"
+        pool = self.connection.connection_pool
+        pool.max_connections = max(pool.max_connections, concurrency * REDIS_CONNECTIONS_PER_JOB)
+        self._running_jobs = {}  # job id -> Job, touched by the job threads and the heartbeat
+
+    def set_current_job_id(self, job_id=None, pipeline=None):
+        # Concurrent jobs would overwrite and clear each other's id
+        pass
+
+    def set_current_job_working_time(self, current_job_working_time, pipeline=None):
+        pass
+
+    def work(self, **kwargs) -> bool:
+        asyncio.run(self._work())
+        return True
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        self._jobs_executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="job")
+        # Heartbeats and maintenance get their own thread, so they never wait behind
+        # slow jobs and let the running ones drop out of StartedJobRegistry
+        loop.set_default_executor(ThreadPoolExecutor(1, thread_name_prefix="heartbeat"))
+        await loop.run_in_executor(None, self.register_birth)
+        logger.info(f"Async worker {self.name} running {self.concurrency} jobs at a time")
+
+        stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopping.set)
+
+        queues = {queue.key: queue for queue in self.queues}
+        redis_conn = aioredis.Redis(host='redis')
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not stopping.is_set():
+                await slots.acquire()
+                ordered = [queue.key for queue in self._ordered_queues]
+                popped = await redis_conn.blpop(ordered, timeout=DEQUEUE_TIMEOUT)
+                if popped is None:
+                    slots.release()
+                    continue
+                queue_key, job_id = popped
+                queue = queues[queue_key.decode()]
+                self.reorder_queues(queue)
+                task = asyncio.create_task(self._run(job_id.decode(), queue, slots))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            logger.info(f"Stopping, waiting for {len(running)} running jobs")
+            await asyncio.gather(*running, return_exceptions=True)
+            self._jobs_executor.shutdown()
+            heartbeat.cancel()
+            await redis_conn.close()
+            await loop.run_in_executor(None, self.register_death)
+
+    async def _run(self, job_id: str, queue, slots: asyncio.Semaphore):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._jobs_executor, self._perform, job_id, queue
+            )
+        except Exception as e:
+            logger.error(f"Failed to run job {job_id}: {str(e)}")
+        finally:
+            slots.release()
+
+    def _perform(self, job_id: str, queue):
+        try:
+            job = Job.fetch(job_id, connection=self.connection, serializer=self.serializer)
+        except NoSuchJobError:
+            logger.warning(f"Job {job_id} was dequeued but no longer exists")
+            return
+        self._running_jobs[job.id] = job
+        try:
+            self.perform_job(job, queue)
+        finally:
+            del self._running_jobs[job.id]
+
+    def _heartbeat_jobs(self):
+        jobs = list(self._running_jobs.values())
+        if not jobs:
+            return
+        with self.connection.pipeline() as pipe:
+            for job in jobs:
+                job.heartbeat(utcnow(), JOB_HEARTBEAT_TTL, pipeline=pipe, xx=True)
+            pipe.execute()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await loop.run_in_executor(None, self.heartbeat)
+                await loop.run_in_executor(None, self._heartbeat_jobs)
+                if self.should_run_maintenance_tasks:
+                    await loop.run_in_executor(None, self.run_maintenance_tasks)
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {str(e)}")
+
+
+if __name__ == "__main__":
+    logger.info("Async worker starting up")
+    worker.metrics_emitter.start(worker.redis_conn)
+    worker.warming_scheduler.start()
+    worker.ingest_scheduler.start()
+    AsyncWorker(worker.WORKER_QUEUES, connection=worker.redis_conn).work()
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from redis import WatchError
+
+from logger import setup_logger
+from profile_policy import PROFILE_HARD_TTL
+
+logger = setup_logger("climatology")
+
+CITIES_KEY = "climatology:cities"  # hash of lowercased city -> name, every city with aggregates
+TICK_LOCK_KEY = "climatology:tick"
+
+# The archive publishes days with this delay, later days would come back empty
+ARCHIVE_DELAY_DAYS = int(os.getenv("ARCHIVE_DELAY_DAYS", "5"))
+# How often every city with aggregates gets its new days folded in
+INGEST_INTERVAL = int(os.getenv("INGEST_INTERVAL", str(86400)))
+# Percentiles can't be folded in, profiles are rebuilt from the store this often
+REBUILD_INTERVAL_DAYS = int(os.getenv("CLIMATOLOGY_REBUILD_DAYS", "30"))
+
+
+def history_end() -> date:
+    """Last day the archive is expected to have."""
+    return date.today() - timedelta(days=ARCHIVE_DELAY_DAYS)
+
+
+def aggregates_key(city: str) -> str:
+    return f"climatology:{city.lower()}"
+
+
+class ClimatologyStore:
+    """Per-(city, month) running aggregates of every stored variable, in Redis.
+
+    One hash per city: `through:<section>` (last day of each section folded in,
+    the daily and hourly stores can be at different days), `built` (day of the
+    last full rebuild) and one (12, 5) float64 array per "<section>:<variable>"
+    (see aggregation.monthly_aggregates). It expires with the city's profiles.
+    """
+
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+
+    @staticmethod
+    def _through(fields: dict) -> dict:
+        """{section: last day folded in} from the hash fields."""
+        through = {
+            name.decode().split(":", 1)[1]: date.fromisoformat(value.decode())
+            for name, value in fields.items()
+            if name.startswith(b"through:")
+        }
+        if b"through" in fields:
+            # Written before each section had its own, one day for all of them
+            legacy = date.fromisoformat(fields[b"through"].decode())
+            for name in fields:
+                section, _, variable = name.decode().partition(":")
+                if variable and section != "through":
+                    through.setdefault(section, legacy)
+        return through
+
+    def load(self, city: str):
+        """({section: through}, built, {name: aggregates}), None if the city has none."""
+        fields = self.redis_conn.hgetall(aggregates_key(city))
+        through = self._through(fields)
+        if not through:
+            return None
+        aggregates = {
+            name.decode(): np.frombuffer(value, dtype=np.float64).reshape(12, 5)
+            for name, value in fields.items()
+            if name not in (b"through", b"built") and not name.startswith(b"through:")
+        }
+        return through, date.fromisoformat(fields[b"built"].decode()), aggregates
+
+    def save(self, city: str, through: dict, built: date, aggregates: dict, previous: dict = None) -> bool:
+        """Store aggregates folded in up to `through`, {section: last day}.
+
+        With `previous`, only if the stored ones are still those folded up to
+        `previous`; returns False when another worker got there first.
+        """
+        key = aggregates_key(city)
+        with self.redis_conn.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if previous is not None and self._through(pipe.hgetall(key)) != previous:
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.hset(key, mapping={
+                    **{f"through:{section}": day.isoformat() for section, day in through.items()},
+                    "built": built.isoformat(),
+                    **{name: values.astype(np.float64).tobytes() for name, values in aggregates.items()},
+                })
+                pipe.expire(key, PROFILE_HARD_TTL)
+                pipe.hsetnx(CITIES_KEY, city.lower(), city)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+
+class IngestScheduler:
+    """Background thread that has every city with aggregates catch up on new days.
+
+    Every INGEST_INTERVAL one process in the fleet (whoever takes the tick
+    lock) calls `ingest(city)` for each of them, typically enqueueing a job.
+    Cities whose aggregates expired are dropped.
+    """
+
+    def __init__(self, redis_conn, ingest, interval: int = INGEST_INTERVAL):
+        self.redis_conn = redis_conn
+        self.ingest = ingest
+        self.interval = interval
+
+    def tick(self) -> list:
+        """One round; returns the cities scheduled."""
+        if not self.redis_conn.set(TICK_LOCK_KEY, 1, nx=True, ex=self.interval):
+            return []
+
+        cities = self.redis_conn.hgetall(CITIES_KEY)
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for member in cities:
+            pipe.exists(aggregates_key(member.decode()))
+        alive = pipe.execute()
+        expired = [member for member, exists in zip(cities, alive) if not exists]
+        if expired:
+            self.redis_conn.hdel(CITIES_KEY, *expired)
+
+        scheduled = []
+        for (member, name), exists in zip(cities.items(), alive):
+            if exists:
+                self.ingest(name.decode())
+                scheduled.append(name.decode())
+        if scheduled:
+            logger.info(f"Scheduled ingestion of new days for {len(scheduled)} cities")
+        return scheduled
+
+    def start(self):
+        def loop():
+            while True:
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Ingestion round failed: {str(e)}")
+                time.sleep(self.interval)
+
+        threading.Thread(target=loop, name="climatology-ingest", daemon=True).start()
@@ -0,0 +1,31 @@
+class CityNotFound(ValueError):
+    """Upstream has no such city. Retrying can't help, so it is never retried."""
+
+
+class NoWeatherData(ValueError):
+    """The city has no usable history to answer from. Also never retried."""
+
+
+class UpstreamUnavailable(ValueError):
+    """The upstream host's circuit breaker is open, the call was not attempted."""
+
+
+# Values of job.meta["error_kind"], the API doesn't requeue jobs that failed with either
+ERROR_TERMINAL = "terminal"
+ERROR_UNAVAILABLE = "unavailable"
+
+
+def error_kind(error: BaseException):
+    """ERROR_TERMINAL, ERROR_UNAVAILABLE or None (worth retrying) for a job's exception.
+
+    Jobs wrap errors in their own ValueErrors, so the whole chain is checked.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (CityNotFound, NoWeatherData)):
+            return ERROR_TERMINAL
+        if isinstance(error, UpstreamUnavailable):
+            return ERROR_UNAVAILABLE
+        error = error.__cause__ or error.__context__
+    return None
@@ -0,0 +1,56 @@
+import os
+
+# Cost classes the API routes jobs to, cheapest first. "default" is still
+# drained so jobs enqueued before the split aren't stranded.
+QUEUE_FAST = "fast"
+QUEUE_SLOW = "slow"
+QUEUE_BACKGROUND = "background"
+WORKER_QUEUES = os.getenv("WORKER_QUEUES", "fast,slow,background,default").split(",")
+
+
+def parse_weights(spec: str) -> dict:
+    """'fast=8,slow=2' -> {'fast': 8, 'slow': 2}"""
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip():
+            weights[name.strip()] = max(int(weight or 1), 1)
+    return weights
+
+
+# Share of dequeues each queue gets while several have work waiting
+QUEUE_WEIGHTS = parse_weights(os.getenv("QUEUE_WEIGHTS", "fast=8,slow=2,background=1,default=1"))
+
+
+class WeightedFairOrder:
+    """Smooth weighted round robin over queue names.
+
+    Workers BLPOP their queues in order() and report the queue a job came
+    from with served(). BLPOP takes from the first non-empty queue, so the
+    queues ordered before it were idle and earn no credit. Queues with work
+    waiting share dequeues in proportion to their weights, so slow jobs can't
+    starve fast ones and fast ones can't fully starve slow ones.
+    """
+
+    def __init__(self, weights: dict = QUEUE_WEIGHTS):
+        self.weights = weights
+        self.credit = {name: 0 for name in weights}
+
+    def weight(self, name: str) -> int:
+        return self.weights.get(name, 1)
+
+    def served(self, name: str, idle=()):
+        """Account for a job taken from `name`; `idle` queues were polled first and empty."""
+        active = [queue for queue in self.credit if queue not in idle]
+        if name not in active:
+            active.append(name)
+        for queue in active:
+            self.credit[queue] = self.credit.get(queue, 0) + self.weight(queue)
+        self.credit[name] -= sum(self.weight(queue) for queue in active)
+
+    def order(self, queues: list, key=lambda queue: queue) -> list:
+        """`queues` sorted by who is owed the next job, heavier weights winning ties."""
+        return sorted(
+            queues,
+            key=lambda queue: (-self.credit.get(key(queue), 0), -self.weight(key(queue))),
+        )
@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import unicodedata
+
+from errors import CityNotFound
+from logger import setup_logger
+from lru import LRUCache
+
+logger = setup_logger("geocoding")
+
+GEOCODE_CACHE_SIZE = 2048
+GEOCODE_EXPIRY = 86400 * 30  # 30 days, cities don't move
+NEGATIVE_EXPIRY = 3600  # 1 hour for names upstream couldn't resolve
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH")
+
+
+def normalize_name(name: str) -> str:
+    """Case, accent and whitespace insensitive form of a city name ("São  Paulo" -> "sao paulo")."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def geocode_key(name: str) -> str:
+    return f"geo:{normalize_name(name)}"
+
+
+class Gazetteer:
+    """Preloaded city list indexed by normalized name.
+
+    Accepts a CSV with a `name,latitude,longitude` header (optional `country`,
+    `population` and `|`-separated `alternate_names` columns) or a JSON list of
+    objects with the same fields. When several places share a name the most
+    populous one wins, matching what the geocoding API returns first.
+    """
+
+    def __init__(self, entries=()):
+        self._index = {}
+        for entry in entries:
+            self.add(entry)
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                entries = json.load(f)
+            else:
+                entries = list(csv.DictReader(f))
+        gazetteer = cls(entries)
+        logger.info(f"Loaded gazetteer from {path} with {len(gazetteer)} names")
+        return gazetteer
+
+    def add(self, entry: dict):
+        location = {
+            "name": entry["name"],
+            "latitude": float(entry["latitude"]),
+            "longitude": float(entry["longitude"]),
+        }
+        if entry.get("country"):
+            location["country"] = entry["country"]
+        population = int(entry.get("population") or 0)
+
+        alternate_names = entry.get("alternate_names") or []
+        if isinstance(alternate_names, str):
+            alternate_names = alternate_names.split("|")
+
+        for name in [entry["name"], *alternate_names]:
+            key = normalize_name(name)
+            if not key:
+                continue
+            current = self._index.get(key)
+            if current is None or population > current[0]:
+                self._index[key] = (population, location)
+
+    def lookup(self, name: str):
+        entry = self._index.get(normalize_name(name))
+        return entry[1] if entry else None
+
+    def __len__(self):
+        return len(self._index)
+
+
+class Geocoder:
+    """Resolves city names through local LRU -> gazetteer -> Redis -> upstream.
+
+    Names upstream could not resolve are cached as negatives (None) with a
+    shorter expiry so repeated bad requests don't cost a round trip each.
+    """
+
+    def __init__(self, redis_conn, gazetteer: Gazetteer = None, maxsize: int = GEOCODE_CACHE_SIZE):
+        self.redis_conn = redis_conn
+        self.gazetteer = gazetteer
+        self.local = LRUCache(maxsize)
+
+    def resolve(self, city: str, fetch) -> dict:
+        """Return the location for `city`, calling `fetch(city)` only on a full miss.
+
+        `fetch` returns a location dict or None when the city does not exist.
+        """
+        key = geocode_key(city)
+
+        found, location = self.local.get(key)
+        if not found:
+            location, found = self._lookup_shared(city, key)
+        if not found:
+            logger.info(f"Geocoding miss for {city}, calling upstream")
+            location = fetch(city)
+            self._store(key, location)
+
+        if location is None:
+            raise CityNotFound(f"Invalid city name or city not found: {city}")
+        return location
+
+    def _lookup_shared(self, city: str, key: str):
+        if self.gazetteer is not None:
+            location = self.gazetteer.lookup(city)
+            if location is not None:
+                self.local.set(key, location)
+                return location, True
+
+        try:
+            cached = self.redis_conn.get(key)
+        except Exception as e:
+            logger.warning(f"Geocoding cache read failed for {city}: {str(e)}")
+            return None, False
+        if cached is None:
+            return None, False
+
+        location = json.loads(cached)
+        self.local.set(key, location, None if location else NEGATIVE_EXPIRY)
+        return location, True
+
+    def _store(self, key: str, location):
+        expiry = GEOCODE_EXPIRY if location else NEGATIVE_EXPIRY
+        self.local.set(key, location, None if location else NEGATIVE_EXPIRY)
+        try:
+            self.redis_conn.setex(key, expiry, json.dumps(location))
+        except Exception as e:
+            logger.warning(f"Geocoding cache write failed for {key}: {str(e)}")
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from histogram import METRICS_RETENTION, METRICS_SERIES_KEY, METRICS_SLOT_SECONDS, bucket_index, histogram_key
+from logger import setup_logger
+
+logger = setup_logger("metrics")
+
+METRICS_FLUSH_INTERVAL = 5
+
+
+class MetricsEmitter:
+    """Buffers timing samples locally and writes them to Redis in batches.
+
+    Writes go onto a caller's pipeline (e.g. the job completion notice) or are
+    flushed every few seconds by a background thread in long-lived processes.
+    """
+
+    def __init__(self):
+        self._pending = defaultdict(Counter)
+        self._sums = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, series: str, duration: float, error: bool = False):
+        slot = int(time.time() // METRICS_SLOT_SECONDS)
+        with self._lock:
+            pending = self._pending[(series, slot)]
+            pending[f"b{bucket_index(duration)}"] += 1
+            pending["count"] += 1
+            if error:
+                pending["errors"] += 1
+            self._sums[(series, slot)] += duration
+
+    def write(self, pipe):
+        """Drain buffered samples onto `pipe`; the caller executes it."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+            sums, self._sums = self._sums, defaultdict(float)
+
+        for (series, slot), fields in pending.items():
+            key = histogram_key(series, slot)
+            for field, count in fields.items():
+                pipe.hincrby(key, field, count)
+            pipe.hincrbyfloat(key, "sum", sums[(series, slot)])
+            pipe.expire(key, METRICS_RETENTION)
+            pipe.sadd(METRICS_SERIES_KEY, series)
+
+    def flush(self, redis_conn):
+        pipe = redis_conn.pipeline(transaction=False)
+        self.write(pipe)
+        if len(pipe):
+            pipe.execute()
+
+    def start(self, redis_conn, interval: float = METRICS_FLUSH_INTERVAL):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush(redis_conn)
+                except Exception as e:
+                    logger.error(f"Failed to flush metrics: {str(e)}")
+
+        threading.Thread(target=loop, name="metrics-flush", daemon=True).start()
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import Counter
+
+from codec import decode_profile, encode_profile
+from logger import setup_logger
+from lru import LRUCache
+from profile_policy import PROFILE_HARD_TTL, PROFILE_SOFT_TTL, is_stale
+
+logger = setup_logger("profile_cache")
+
+LOCAL_CACHE_SIZE = 4096
+# Short, so profiles refreshed by the other worker show up quickly
+LOCAL_CACHE_TTL = 60
+STATS_KEY = "metrics:cache"
+STATS_FLUSH_INTERVAL = 10
+
+
+class CacheStats:
+    """Per-tier hit/miss/stale counters, flushed to a Redis hash every few seconds."""
+
+    def __init__(self, redis_conn, key: str = STATS_KEY, interval: float = STATS_FLUSH_INTERVAL):
+        self.redis_conn = redis_conn
+        self.key = key
+        self.interval = interval
+        self._pending = Counter()
+        self._totals = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, tier: str, outcome: str):
+        field = f"{tier}:{outcome}"
+        with self._lock:
+            self._pending[field] += 1
+            self._totals[field] += 1
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def write(self, pipe):
+        """Drain pending counters onto `pipe`; the caller executes it.
+
+        Forked work horses exit without flushing, so jobs write them on their
+        completion notice.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        for field, count in pending.items():
+            pipe.hincrby(self.key, field, count)
+
+    def flush(self):
+        try:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            self.write(pipe)
+            if len(pipe):
+                pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to flush cache stats: {str(e)}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._totals)
+
+
+class ProfileCache:
+    """Profile lookups through a per-process LRU, then Redis.
+
+    Entries past the soft TTL (judged by their `updated_at`) are returned as
+    usual and handed to `on_stale(key, profile)` so a refresh can be scheduled.
+    """
+
+    def __init__(
+        self,
+        redis_conn,
+        on_stale=None,
+        soft_ttl: int = PROFILE_SOFT_TTL,
+        hard_ttl: int = PROFILE_HARD_TTL,
+        local_size: int = LOCAL_CACHE_SIZE,
+        local_ttl: int = LOCAL_CACHE_TTL,
+    ):
+        self.redis_conn = redis_conn
+        self.on_stale = on_stale
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.local_ttl = local_ttl
+        self.local = LRUCache(local_size)
+        self.stats = CacheStats(redis_conn)
+
+    def is_stale(self, profile: dict, ahead: float = 0) -> bool:
+        """Past the soft TTL, or within `ahead` seconds of it."""
+        return is_stale(profile, self.soft_ttl, ahead)
+
+    def get(self, key: str):
+        return self.get_many([key])[key]
+
+    def get_many(self, keys: list) -> dict:
+        """{key: profile or None}, reading every local miss with a single MGET."""
+        found = {}
+        tiers = {}
+        missing = []
+        for key in keys:
+            hit, profile = self.local.get(key)
+            if hit:
+                found[key], tiers[key] = profile, "local"
+            else:
+                self.stats.record("local", "miss")
+                missing.append(key)
+
+        if missing:
+            for key, cached in zip(missing, self.redis_conn.mget(missing)):
+                if cached is None:
+                    self.stats.record("redis", "miss")
+                    found[key] = None
+                    continue
+                profile = decode_profile(cached)
+                self.local.set(key, profile, self.local_ttl)
+                found[key], tiers[key] = profile, "redis"
+
+        for key, tier in tiers.items():
+            self._check_freshness(key, found[key], tier)
+        return found
+
+    def _check_freshness(self, key: str, profile: dict, tier: str):
+        if not self.is_stale(profile):
+            self.stats.record(tier, "hit")
+            return
+        self.stats.record(tier, "stale")
+        if self.on_stale:
+            try:
+                self.on_stale(key, profile)
+            except Exception as e:
+                logger.error(f"Failed to schedule refresh for {key}: {str(e)}")
+
+    def set_many(self, profiles: dict):
+        """Write {key: profile} to both tiers, Redis in one pipelined round trip."""
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for key, profile in profiles.items():
+            self.local.set(key, profile, self.local_ttl)
+            pipe.setex(key, self.hard_ttl, encode_profile(profile))
+        pipe.execute()
+
+    def set(self, key: str, profile: dict):
+        self.set_many({key: profile})
@@ -0,0 +1,82 @@
+import json
+import uuid
+
+import tracing
+from logger import setup_logger
+
+logger = setup_logger("singleflight")
+
+FLIGHT_LOCK_TTL = 120  # seconds, longer than a cold whole-range fetch
+FLIGHT_RESULT_TTL = 30  # how long late waiters can still pick up a result
+
+# Only delete the lock if we still own it
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Cross-process single-flight: the first caller for a key runs the work,
+    concurrent callers block on a Redis list until it publishes the result.
+
+    Results must be JSON serializable. The notification list is re-pushed by
+    every waiter that pops it, so any number of waiters see the same message.
+    Waiters re-raise the leader's error as a ValueError, or as its own class
+    when that is one of `errors`.
+    """
+
+    def __init__(self, redis_conn, lock_ttl: int = FLIGHT_LOCK_TTL, result_ttl: int = FLIGHT_RESULT_TTL,
+                 errors: tuple = ()):
+        self.redis_conn = redis_conn
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.errors = {error.__name__: error for error in errors}
+        self._release = redis_conn.register_script(RELEASE_SCRIPT)
+
+    def do(self, key: str, fn):
+        lock_key, done_key = f"flight:{key}:lock", f"flight:{key}:done"
+
+        while True:
+            token = uuid.uuid4().hex
+            if self.redis_conn.set(lock_key, token, nx=True, ex=self.lock_ttl):
+                return self._lead(lock_key, done_key, token, fn)
+
+            logger.info(f"Waiting for in-flight computation of {key}")
+            with tracing.span("singleflight.wait"):
+                popped = self.redis_conn.blpop([done_key], timeout=self.lock_ttl)
+            if popped is None:
+                # Leader died without notifying, the lock has expired by now
+                logger.warning(f"Timed out waiting for {key}, retrying as leader")
+                continue
+
+            message = popped[1]
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.rpush(done_key, message)
+            pipe.expire(done_key, self.result_ttl)
+            pipe.execute()
+
+            outcome = json.loads(message)
+            if outcome["ok"]:
+                return outcome["result"]
+            raise self.errors.get(outcome.get("type"), ValueError)(outcome["error"])
+
+    def _lead(self, lock_key: str, done_key: str, token: str, fn):
+        # Drop any notification left over from a previous flight
+        self.redis_conn.delete(done_key)
+        outcome = {"ok": False, "error": f"Computation of {lock_key} was interrupted"}
+        try:
+            result = fn()
+            outcome = {"ok": True, "result": result}
+            return result
+        except Exception as e:
+            outcome = {"ok": False, "error": str(e), "type": type(e).__name__}
+            raise
+        finally:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.rpush(done_key, json.dumps(outcome))
+            pipe.expire(done_key, self.result_ttl)
+            pipe.execute()
+            self._release(keys=[lock_key], args=[token])
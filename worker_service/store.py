@@ -0,0 +1,208 @@
+import fcntl
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from logger import setup_logger
+
+logger = setup_logger("store")
+
+STORE_DIR = os.getenv("WEATHER_STORE_DIR", "/data/weather_store")
+
+# Files written before stores recorded their own first day are indexed by day
+# offset from this epoch (the archive API starts in 1940)
+STORE_EPOCH = date(1940, 1, 1)
+
+
+def _variables_from_env(name: str) -> tuple:
+    return tuple(variable.strip() for variable in os.getenv(name, "").split(",") if variable.strip())
+
+
+# Daily temperatures drive every profile. More daily variables (e.g.
+# precipitation_sum, relative_humidity_2m_mean) and hourly ones (e.g.
+# temperature_2m, precipitation, relative_humidity_2m) are opt-in, each adds
+# its own fields to the profiles. Changing either list refetches stored cities.
+DAILY_VARIABLES = tuple(dict.fromkeys(
+    ("temperature_2m_min", "temperature_2m_max") + _variables_from_env("EXTRA_DAILY_VARIABLES")
+))
+HOURLY_VARIABLES = _variables_from_env("HOURLY_VARIABLES")
+
+
+def day_index(day: date, origin: date = STORE_EPOCH) -> int:
+    return (day - origin).days
+
+
+class DailyStore:
+    """On-disk columnar store of daily values, one memory-mapped file per location.
+
+    Each location has a `<key>.npy` float32 array of shape (variables, days) and a
+    `<key>.json` sidecar recording the contiguous date range already fetched, the
+    day the array starts at and which variables its rows hold.
+    """
+
+    section = "daily"  # the archive response section the values come from
+    per_day = 1
+    unit = "D"
+
+    def __init__(self, root: str = STORE_DIR, variables=DAILY_VARIABLES):
+        self.root = root
+        self.variables = tuple(variables)
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def location_key(latitude: float, longitude: float) -> str:
+        return f"{latitude:.4f}_{longitude:.4f}"
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.npy")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _meta(self, key: str):
+        """The sidecar of `key`, None if there is none or it holds other variables."""
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if tuple(meta.get("variables", ())) != self.variables:
+            return None
+        return meta
+
+    def _origin(self, meta: dict) -> date:
+        return date.fromisoformat(meta["origin"]) if "origin" in meta else STORE_EPOCH
+
+    def coverage(self, key: str):
+        meta = self._meta(key)
+        if meta is None:
+            return None
+        return date.fromisoformat(meta["start"]), date.fromisoformat(meta["end"])
+
+    def missing_ranges(self, key: str, start: date, end: date):
+        """Date ranges in [start, end] that are not on disk yet.
+
+        Ranges always extend the stored coverage from its edges so it stays
+        contiguous.
+        """
+        covered = self.coverage(key)
+        if covered is None:
+            return [(start, end)]
+
+        covered_start, covered_end = covered
+        missing = []
+        if start < covered_start:
+            missing.append((start, covered_start - timedelta(days=1)))
+        if end > covered_end:
+            missing.append((covered_end + timedelta(days=1), end))
+        return missing
+
+    def read(self, key: str, start: date, end: date):
+        """Return (dates, {variable: values}) for the covered part of [start, end].
+
+        Values are read-only views into the memory-mapped file, dates are
+        datetime64 in the store's unit (days, or hours for HourlyStore).
+        """
+        meta = self._meta(key)
+        if meta is None:
+            raise KeyError(f"No stored data for location {key}")
+
+        start = max(start, date.fromisoformat(meta["start"]))
+        end = min(end, date.fromisoformat(meta["end"]))
+        origin = self._origin(meta)
+        data = np.load(self._data_path(key), mmap_mode="r")
+        lo = day_index(start, origin) * self.per_day
+        hi = (day_index(end, origin) + 1) * self.per_day
+        dates = np.arange(
+            np.datetime64(start, self.unit),
+            np.datetime64(end + timedelta(days=1), self.unit),
+            dtype=f"datetime64[{self.unit}]",
+        )
+        columns = {
+            variable: data[row, lo:hi] for row, variable in enumerate(self.variables)
+        }
+        return dates, columns
+
+    def write(self, key: str, start: date, columns: dict):
+        """Merge columns of whole days beginning at `start` into the location file.
+
+        Trailing days without a single value are left out, so they stay missing.
+        """
+        lengths = {len(columns[variable]) for variable in self.variables}
+        if len(lengths) != 1:
+            raise ValueError(f"Columns for {key} have mismatched lengths: {lengths}")
+        values = lengths.pop()
+        if values == 0:
+            return
+        if values % self.per_day:
+            raise ValueError(f"Columns for {key} don't cover whole days: {values} values")
+        days = values // self.per_day
+        # The archive returns nulls for its latest days until they are published,
+        # storing those would mark them covered for good
+        present = np.zeros(days, dtype=bool)
+        for variable in self.variables:
+            column = np.asarray(columns[variable], dtype=np.float32).reshape(days, self.per_day)
+            present |= ~np.isnan(column).all(axis=1)
+        if not present.any():
+            logger.info(f"No {self.section} values for {key} from {start} on yet, nothing stored")
+            return
+        days = int(np.flatnonzero(present)[-1]) + 1
+        values = days * self.per_day
+        end = start + timedelta(days=days - 1)
+
+        # Serialize writers across processes (worker and worker2 share the volume)
+        with open(os.path.join(self.root, f"{key}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            meta = self._meta(key)
+            if meta is not None:
+                # Keep existing days where they are relative to the new first day
+                existing = np.load(self._data_path(key))
+                origin = min(start, self._origin(meta))
+                shift = day_index(self._origin(meta), origin) * self.per_day
+                new_start = min(start, date.fromisoformat(meta["start"]))
+                new_end = max(end, date.fromisoformat(meta["end"]))
+                size = max((day_index(new_end, origin) + 1) * self.per_day, shift + existing.shape[1])
+                merged = np.full((len(self.variables), size), np.nan, dtype=np.float32)
+                merged[:, shift : shift + existing.shape[1]] = existing
+            else:
+                origin, new_start, new_end = start, start, end
+                merged = np.full((len(self.variables), values), np.nan, dtype=np.float32)
+
+            lo = day_index(start, origin) * self.per_day
+            for row, variable in enumerate(self.variables):
+                # Streamed columns are float32 already, NaN where the archive had no reading
+                merged[row, lo : lo + values] = np.asarray(columns[variable][:values], dtype=np.float32)
+
+            tmp_data = self._data_path(key) + ".tmp"
+            with open(tmp_data, "wb") as f:
+                np.save(f, merged)
+            os.replace(tmp_data, self._data_path(key))
+
+            tmp_meta = self._meta_path(key) + ".tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump(
+                    {
+                        "start": new_start.isoformat(),
+                        "end": new_end.isoformat(),
+                        "origin": origin.isoformat(),
+                        "variables": list(self.variables),
+                    },
+                    f,
+                )
+            os.replace(tmp_meta, self._meta_path(key))
+
+        logger.info(f"Stored {days} days of {self.section} values for {key} ({start} to {end})")
+
+
+class HourlyStore(DailyStore):
+    """DailyStore of hourly values, 24 per day, under `<STORE_DIR>/hourly`."""
+
+    section = "hourly"
+    per_day = 24
+    unit = "h"
+
+    def __init__(self, root: str = os.path.join(STORE_DIR, "hourly"), variables=HOURLY_VARIABLES):
+        super().__init__(root, variables)
@@ -0,0 +1,135 @@
+import contextvars
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Share of requests whose spans are kept, slow ones are always kept
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_SLOW_THRESHOLD = float(os.getenv("TRACE_SLOW_THRESHOLD", "5"))
+# Must match api_service/app/core/tracing.py
+TRACE_TTL = 3600
+RECENT_TRACES_KEY = "traces:recent"
+MAX_RECENT_TRACES = 1000
+MAX_SPANS = 200
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+def trace_key(trace_id: str) -> str:
+    return f"trace:{trace_id}"
+
+
+class JobTrace:
+    """Spans of one job, part of the request trace started in the API endpoint.
+
+    Spans are appended from the job's threads and from the upstream event
+    loop, list.append is atomic so no lock is needed.
+    """
+
+    def __init__(self, trace_id: str, sampled: bool, job_id: str, func_name: str):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.job_id = job_id
+        self.func_name = func_name
+        self.started = time.perf_counter()
+        self.queue_wait = None
+        self.spans = []
+
+    def add(self, name: str, start: float, duration: float):
+        self.spans.append((name, start - self.started, duration))
+
+    def stages(self) -> dict:
+        """{stage: total seconds} for this job."""
+        totals = defaultdict(float)
+        for name, _, duration in self.spans:
+            totals[name] += duration
+        return totals
+
+    def write(self, pipe, status: str):
+        """Store the summary on `pipe` if this trace is sampled or slow."""
+        duration = time.perf_counter() - self.started
+        if not self.sampled and duration < TRACE_SLOW_THRESHOLD:
+            return
+
+        counts = defaultdict(int)
+        for name, _, _ in self.spans:
+            counts[name] += 1
+        summary = {
+            "job_id": self.job_id,
+            "func": self.func_name,
+            "status": status,
+            "pid": os.getpid(),
+            "queue_wait_ms": round(self.queue_wait * 1000, 2) if self.queue_wait is not None else None,
+            "duration_ms": round(duration * 1000, 2),
+            "stages": {
+                name: {"count": counts[name], "total_ms": round(total * 1000, 2)}
+                for name, total in sorted(self.stages().items())
+            },
+            "spans": [
+                [name, round(start * 1000, 2), round(span_duration * 1000, 2)]
+                for name, start, span_duration in self.spans[:MAX_SPANS]
+            ],
+        }
+        key = trace_key(self.trace_id)
+        pipe.hset(key, f"job:{self.job_id}", json.dumps(summary))
+        pipe.expire(key, TRACE_TTL)
+        pipe.zadd(RECENT_TRACES_KEY, {self.trace_id: duration + (self.queue_wait or 0)}, gt=True)
+        pipe.zremrangebyrank(RECENT_TRACES_KEY, 0, -MAX_RECENT_TRACES - 1)
+
+
+def start_job(job) -> contextvars.Token:
+    """Make the trace the API attached to `job` current, or start one for jobs enqueued without."""
+    parent = job.meta.get("trace") or {}
+    trace = JobTrace(
+        parent.get("id") or uuid.uuid4().hex,
+        parent.get("sampled", random.random() < TRACE_SAMPLE_RATE),
+        job.id,
+        job.func_name.rsplit(".", 1)[-1],
+    )
+    return _current.set(trace)
+
+
+def end_job(token: contextvars.Token):
+    _current.reset(token)
+
+
+def current() -> JobTrace:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a stage of the current trace, a no-op outside of a job."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter() - start)
+
+
+def bind(fn):
+    """Wrap `fn` to run under the caller's trace, for thread pools."""
+    trace = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+async def carry(coro, trace: JobTrace):
+    """Await `coro` under `trace`; asyncio tasks have their own context so this doesn't leak."""
+    _current.set(trace)
+    return await coro
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+from redis import asyncio as aioredis
+
+import tracing
+from archive_stream import STREAM_CHUNK_SIZE
+from errors import UpstreamUnavailable
+from logger import setup_logger
+
+logger = setup_logger("upstream")
+
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+GEOCODING_URL = os.getenv("GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+ARCHIVE_URL = os.getenv("ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# Requests per second and burst size per upstream host, shared by every worker
+UPSTREAM_BUDGETS = {
+    urlsplit(GEOCODING_URL).hostname: (
+        float(os.getenv("GEOCODING_RATE", "5")),
+        float(os.getenv("GEOCODING_BURST", "10")),
+    ),
+    urlsplit(ARCHIVE_URL).hostname: (
+        float(os.getenv("ARCHIVE_RATE", "2")),
+        float(os.getenv("ARCHIVE_BURST", "4")),
+    ),
+}
+DEFAULT_BUDGET = (2.0, 4.0)
+MAX_429_RETRIES = 3
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "30"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+
+# Consecutive failures (5xx, exhausted 429 retries, timeouts) that open a host's
+# breaker, and how long it stays open before one probe request is let through
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+# A probe that hasn't reported back by then is presumed dead and another is allowed
+BREAKER_PROBE_TIMEOUT = UPSTREAM_TIMEOUT + UPSTREAM_CONNECT_TIMEOUT
+BREAKER_HOSTS_KEY = "breaker:hosts"
+
+# Reserve one token and return how many ms the caller must wait before using it.
+# Tokens may go negative, which queues callers fairly without retry loops.
+# Uses the Redis clock so every container agrees on time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 60000)
+if tokens >= 0 then
+    return 0
+end
+return math.ceil(-tokens * 1000 / rate)
+"""
+
+
+# 0: reject. 1: go ahead and report the outcome. 2: closed with no failures,
+# only a failure needs reporting. After the cooldown an open breaker turns
+# half-open and admits a single probe at a time.
+BREAKER_ALLOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'state', 'failures', 'opened_at', 'probe_until')
+if state[1] ~= 'open' and state[1] ~= 'half_open' then
+    if (tonumber(state[2]) or 0) == 0 then
+        return 2
+    end
+    return 1
+end
+if now - (tonumber(state[3]) or 0) < tonumber(ARGV[1]) or now < (tonumber(state[4]) or 0) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'state', 'half_open', 'probe_until', now + tonumber(ARGV[2]))
+return 1
+"""
+
+# Record one outcome and return the resulting state, 'recovered' when a success
+# closed it. Any failure while half-open reopens the breaker.
+BREAKER_RECORD_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if ARGV[1] == '1' then
+    redis.call('HSET', KEYS[1], 'state', 'closed', 'failures', 0, 'probe_until', 0)
+    if state ~= 'closed' then
+        return 'recovered'
+    end
+    return 'closed'
+end
+redis.call('SADD', KEYS[2], ARGV[3])
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+if state == 'half_open' or (state == 'closed' and failures >= tonumber(ARGV[2])) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', now, 'probe_until', 0)
+    redis.call('HINCRBY', KEYS[1], 'opens', 1)
+    return 'open'
+end
+return state
+"""
+
+
+class CircuitBreaker:
+    """Fleet-wide circuit breaker per upstream host, stored in Redis.
+
+    While a host is failing, callers get UpstreamUnavailable immediately
+    instead of each waiting out its own timeouts.
+    """
+
+    def __init__(self, redis_conn, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown_ms = int(cooldown * 1000)
+        self.probe_timeout_ms = int(BREAKER_PROBE_TIMEOUT * 1000)
+        self._allow = redis_conn.register_script(BREAKER_ALLOW_SCRIPT)
+        self._record = redis_conn.register_script(BREAKER_RECORD_SCRIPT)
+
+    async def allow(self, host: str) -> int:
+        allowed = await self._allow(
+            keys=[f"breaker:{host}"], args=[self.cooldown_ms, self.probe_timeout_ms]
+        )
+        if not allowed:
+            raise UpstreamUnavailable(f"Upstream {host} is unavailable, circuit breaker open")
+        return allowed
+
+    async def record(self, host: str, ok: bool):
+        state = await self._record(
+            keys=[f"breaker:{host}", BREAKER_HOSTS_KEY], args=[int(ok), self.failures, host]
+        )
+        if state == b"open":
+            logger.warning(f"Circuit breaker for {host} is open")
+        elif state == b"recovered":
+            logger.info(f"Circuit breaker for {host} is closed")
+
+
+class TokenBucket:
+    """Fleet-wide token bucket per upstream host, stored in Redis."""
+
+    def __init__(self, redis_conn, budgets: dict = UPSTREAM_BUDGETS):
+        self.budgets = budgets
+        self._reserve = redis_conn.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, host: str):
+        rate, capacity = self.budgets.get(host, DEFAULT_BUDGET)
+        wait_ms = await self._reserve(keys=[f"ratelimit:{host}"], args=[rate, capacity])
+        if wait_ms:
+            with tracing.span("upstream.rate_limit"):
+                await asyncio.sleep(wait_ms / 1000)
+
+
+class UpstreamClient:
+    """Long-lived async HTTP/2 client with keep-alive, throttled by the shared token
+    bucket and guarded by the shared circuit breaker."""
+
+    def __init__(self, redis_conn=None):
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        self.redis_conn = redis_conn or aioredis.Redis(host=REDIS_HOST)
+        self.bucket = TokenBucket(self.redis_conn)
+        self.breaker = CircuitBreaker(self.redis_conn)
+
+    async def get_json(self, url: str, params: dict) -> dict:
+        async def parse(response):
+            await response.aread()
+            return response.json()
+
+        return await self._fetch(url, params, parse)
+
+    async def get_streamed(self, url: str, params: dict, decoder) -> dict:
+        """GET a large JSON body, fed to `decoder` (feed/close, see archive_stream.py)
+        chunk by chunk as it arrives instead of being loaded whole."""
+        async def parse(response):
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                decoder.feed(chunk)
+            return decoder.close()
+
+        return await self._fetch(url, params, parse)
+
+    async def _fetch(self, url: str, params: dict, parse):
+        host = urlsplit(url).hostname
+        allowed = await self.breaker.allow(host)
+        try:
+            response = await self._get(host, url, params)
+            try:
+                if response.status_code >= 500 or response.status_code == 429:
+                    response.raise_for_status()
+                # 4xx bodies carry {"error": true, "reason": ...}, callers report those.
+                # Reading the body and decoding it overlap, both are timed here.
+                with tracing.span("upstream.parse"):
+                    result = await parse(response)
+            finally:
+                await response.aclose()
+        except httpx.HTTPError:
+            await self.breaker.record(host, ok=False)
+            raise
+        if allowed == 1:
+            await self.breaker.record(host, ok=True)
+        return result
+
+    async def _get(self, host: str, url: str, params: dict) -> httpx.Response:
+        """The response once its headers are in, the body is left to the caller."""
+        for attempt in range(MAX_429_RETRIES + 1):
+            await self.bucket.acquire(host)
+            with tracing.span("upstream.http"):
+                response = await self.client.send(
+                    self.client.build_request("GET", url, params=params), stream=True
+                )
+            if response.status_code != 429 or attempt == MAX_429_RETRIES:
+                break
+            await response.aclose()
+            retry_after = float(response.headers.get("Retry-After", 2 ** attempt))
+            logger.warning(f"Rate limited by {host}, retrying in {retry_after}s")
+            await asyncio.sleep(retry_after)
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
+        await self.redis_conn.close()
+
+
+# Sync callers (RQ jobs) share one event loop thread and client per process.
+# Both are recreated after a fork since threads don't survive it.
+_loop = None
+_loop_pid = None
+_client = None
+_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop, _loop_pid, _client
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _client = None
+            threading.Thread(target=_loop.run_forever, name="upstream-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared upstream loop from sync code, under the caller's trace."""
+    return asyncio.run_coroutine_threadsafe(tracing.carry(coro, tracing.current()), _get_loop()).result()
+
+
+def get_client() -> UpstreamClient:
+    global _client
+    loop = _get_loop()
+    with _lock:
+        if _client is None:
+            # Create inside the loop so the client binds to it
+            _client = asyncio.run_coroutine_threadsafe(_create_client(), loop).result()
+        return _client
+
+
+async def _create_client() -> UpstreamClient:
+    return UpstreamClient()
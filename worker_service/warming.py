@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from logger import setup_logger
+
+logger = setup_logger("warming")
+
+POPULARITY_KEY = "popularity:cities"  # sorted set of lowercased city -> decayed query count
+NAMES_KEY = "popularity:names"  # hash of lowercased city -> name as first queried
+TICK_LOCK_KEY = "warming:tick"
+
+# Query counts halve every POPULARITY_HALF_LIFE seconds
+POPULARITY_HALF_LIFE = int(os.getenv("POPULARITY_HALF_LIFE", str(86400)))
+# Cities whose decayed count falls below this are forgotten
+POPULARITY_MIN_SCORE = 0.05
+# Warmed when nothing has been queried yet
+WARM_SEED_CITIES = [
+    city.strip() for city in os.getenv("WARM_SEED_CITIES", "New York,London").split(",") if city.strip()
+]
+WARM_INTERVAL = int(os.getenv("WARM_INTERVAL", "60"))
+# Cities the whole fleet may warm per hour, each costs about one archive call
+WARM_BUDGET_PER_HOUR = float(os.getenv("WARM_BUDGET_PER_HOUR", "120"))
+# How many of the most popular cities are kept warm
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "100"))
+# Popular cities are refreshed this long before their profiles go stale
+WARM_AHEAD = 86400
+
+
+class PopularityTracker:
+    """Per-city query counts with exponential decay, kept in a Redis sorted set.
+
+    Counts are buffered locally and written onto a caller's pipeline, so
+    recording a query costs no round trip of its own.
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def record(self, cities, weight: float = 1):
+        with self._lock:
+            for city in cities:
+                member = city.strip().lower()
+                self._pending[member] += weight
+                self._names.setdefault(member, city.strip())
+
+    def write(self, pipe):
+        """Drain buffered counts onto `pipe`; the caller executes it."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            names, self._names = self._names, {}
+        for member, weight in pending.items():
+            pipe.zincrby(POPULARITY_KEY, weight, member)
+            pipe.hsetnx(NAMES_KEY, member, names[member])
+
+    def flush(self, redis_conn):
+        pipe = redis_conn.pipeline(transaction=False)
+        self.write(pipe)
+        if len(pipe):
+            pipe.execute()
+
+
+class WarmingScheduler:
+    """Background thread that keeps the most queried cities cached.
+
+    Every WARM_INTERVAL one process in the fleet (whoever takes the tick lock)
+    decays the counts, asks `needs_warming(cities)` which of the top cities are
+    missing or about to go stale, and calls `warm(city)` on the hottest of them,
+    at most WARM_BUDGET_PER_HOUR cities per hour.
+    """
+
+    def __init__(
+        self,
+        redis_conn,
+        needs_warming,
+        warm,
+        interval: int = WARM_INTERVAL,
+        budget_per_hour: float = WARM_BUDGET_PER_HOUR,
+        top_n: int = WARM_TOP_N,
+        half_life: int = POPULARITY_HALF_LIFE,
+    ):
+        self.redis_conn = redis_conn
+        self.needs_warming = needs_warming
+        self.warm = warm
+        self.interval = interval
+        self.per_tick = budget_per_hour * interval / 3600
+        self.top_n = top_n
+        self.decay = 0.5 ** (interval / half_life)
+        self._credit = 0.0
+
+    def hottest(self) -> list:
+        """Top cities by decayed query count, seeding the set if nobody queried yet."""
+        members = self.redis_conn.zrevrange(POPULARITY_KEY, 0, self.top_n - 1)
+        if not members and WARM_SEED_CITIES:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.zadd(POPULARITY_KEY, {city.lower(): 1 for city in WARM_SEED_CITIES}, nx=True)
+            pipe.hset(NAMES_KEY, mapping={city.lower(): city for city in WARM_SEED_CITIES})
+            pipe.execute()
+            return list(WARM_SEED_CITIES)
+        if not members:
+            return []
+        names = self.redis_conn.hmget(NAMES_KEY, members)
+        return [(name or member).decode() for member, name in zip(members, names)]
+
+    def tick(self) -> list:
+        """One warming round; returns the cities warmed."""
+        if not self.redis_conn.set(TICK_LOCK_KEY, 1, nx=True, ex=self.interval):
+            return []
+
+        pipe = self.redis_conn.pipeline(transaction=False)
+        pipe.zunionstore(POPULARITY_KEY, {POPULARITY_KEY: self.decay})
+        pipe.zremrangebyscore(POPULARITY_KEY, "-inf", POPULARITY_MIN_SCORE)
+        pipe.execute()
+
+        # Unused budget carries over for one tick, so a quiet minute doesn't waste it
+        self._credit = min(self._credit + self.per_tick, 2 * max(self.per_tick, 1))
+        candidates = self.needs_warming(self.hottest())
+        warmed = []
+        for city in candidates:
+            if self._credit < 1:
+                break
+            self._credit -= 1
+            self.warm(city)
+            warmed.append(city)
+        if warmed:
+            logger.info(f"Warmed {warmed}, {len(candidates) - len(warmed)} more waiting for budget")
+        return warmed
+
+    def start(self):
+        def loop():
+            while True:
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Cache warming round failed: {str(e)}")
+                time.sleep(self.interval)
+
+        threading.Thread(target=loop, name="cache-warming", daemon=True).start()
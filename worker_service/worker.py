@@ -1,78 +1,123 @@
 import httpx
-import statistics
+import numpy as np
 from redis import Redis, ConnectionPool
-from rq import Worker
+from rq import Queue, Worker
 import json
+import sys
 import time
 from concurrent.futures import ThreadPoolExecutor
-import zlib
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
+import aggregation
+import tracing
+from archive_stream import ArchiveDecoder
+from climate_index import ClimateIndexPublisher
+from climatology import REBUILD_INTERVAL_DAYS, ClimatologyStore, IngestScheduler, history_end
+from fair_queue import QUEUE_BACKGROUND, WORKER_QUEUES, WeightedFairOrder
+from geocoding import GAZETTEER_PATH, Gazetteer, Geocoder
 from logger import setup_logger
+from lru import LRUCache
+from metrics_emitter import MetricsEmitter
+from profile_cache import ProfileCache
+from profile_policy import REFRESH_JOB, REFRESH_LOCK_TTL, REFRESH_QUEUE, profile_key, refresh_lock_key
+from codec import decode_profile
+from errors import CityNotFound, NoWeatherData, UpstreamUnavailable, error_kind
+from singleflight import SingleFlight
+from store import DAILY_VARIABLES, HOURLY_VARIABLES, DailyStore, HourlyStore
+from upstream import ARCHIVE_URL, GEOCODING_URL, get_client, run_sync
+from warming import WARM_AHEAD, PopularityTracker, WarmingScheduler
+from worker_pool import WORKER_MAX_JOBS, WORKER_MODE, WORKER_POOL_SIZE, RecyclingWorker, Supervisor
 
 logger = setup_logger("worker")
+setup_logger("climate_index")
 
 REDIS_POOL = ConnectionPool(host='redis', max_connections=10)
 redis_conn = Redis(connection_pool=REDIS_POOL)
 
-# By popularity & size
-TOP_CITIES = [
-#    "Tokyo", "Delhi", "Shanghai", "São Paulo", 
-#    "Mexico City", "Cairo", "Mumbai", "Beijing",
-    "New York", "London"
-]
-
-# This data doesn't change. Let the cache live
-CACHE_EXPIRY = 86400 * 7  # 7 days
 MAX_WORKERS = 4
-API_RATE_LIMIT = 0.5
+JOB_NOTIFY_EXPIRY = 600  # keep completion notices around for late waiters
+
+# Profiles cover every day from this one up to the latest the archive has
+# published (climatology.history_end), new days are folded in incrementally
+HISTORY_START = date(2018, 1, 1)
+
+daily_store = DailyStore()
+# Hourly history is only fetched and stored when HOURLY_VARIABLES is set
+history_stores = [daily_store] + ([HourlyStore()] if HOURLY_VARIABLES else [])
+single_flight = SingleFlight(redis_conn, errors=(CityNotFound, UpstreamUnavailable))
+metrics_emitter = MetricsEmitter()
+recent_refreshes = LRUCache(1024)
+profile_cache = ProfileCache(
+    redis_conn, on_stale=lambda key, profile: schedule_refresh(profile["city"])
+)
+geocoder = Geocoder(
+    redis_conn, Gazetteer.load(GAZETTEER_PATH) if GAZETTEER_PATH else None
+)
+# Workers publish points as they cache profiles, the API searches them
+climate_index = ClimateIndexPublisher(redis_conn)
+climatology_store = ClimatologyStore(redis_conn)
+popularity = PopularityTracker()
+warming_scheduler = WarmingScheduler(
+    redis_conn, lambda cities: cities_needing_warming(cities), lambda city: cache_city(city)
+)
+ingest_scheduler = IngestScheduler(
+    redis_conn,
+    lambda city: Queue(QUEUE_BACKGROUND, connection=redis_conn).enqueue("worker.ingest_recent_days", city),
+)
 
 class WeatherAPI:
+    """Open-Meteo calls for sync job code.
+
+    All instances share the process-wide async upstream client, so connections
+    are reused and every request goes through the fleet-wide rate limiter.
+    """
+
     def __init__(self):
-        self.client = httpx.Client(
-            timeout=30,
-            limits=httpx.Limits(max_keepalive_connections=5),
-            headers={'Accept-Encoding': 'gzip'}
-        )
-        self.last_call = 0
+        self.upstream = get_client()
 
-    def _rate_limit(self):
-        now = time.time()
-        time_since_last = now - self.last_call
-        if time_since_last < API_RATE_LIMIT:
-            time.sleep(API_RATE_LIMIT - time_since_last)
-        self.last_call = time.time()
+    def get_location(self, city: str) -> dict:
+        with tracing.span("geocoding"):
+            return geocoder.resolve(city, self._fetch_location)
 
-    def get_weather_data(self, city: str, start_date: str, end_date: str):
-        self._rate_limit()
-        logger.info(f"Fetching weather data for {city} from {start_date} to {end_date}")
+    def _fetch_location(self, city: str):
+        logger.info(f"Resolving coordinates for {city}")
         try:
-            # Get coordinates
-            geocoding_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
-            geo_response = self.client.get(geocoding_url)
-            geo_data = geo_response.json()
-
-            if "results" not in geo_data or not geo_data["results"]:
-                logger.error(f"No coordinates found for city: {city}")
-                raise ValueError(f"Invalid city name or city not found: {city}")
-
-            location = geo_data["results"][0]
-
-            self._rate_limit()
-            # Get weather data
-            weather_url = (
-                f"https://archive-api.open-meteo.com/v1/archive"
-                f"?latitude={location['latitude']}"
-                f"&longitude={location['longitude']}"
-                f"&start_date={start_date}"
-                f"&end_date={end_date}"
-                f"&daily=temperature_2m_max,temperature_2m_min"
+            geo_data = run_sync(
+                self.upstream.get_json(GEOCODING_URL, {"name": city, "count": 1})
             )
-            weather_response = self.client.get(weather_url)
-            weather_data = weather_response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP error while resolving {city}: {str(e)}")
+            raise ValueError(f"Failed to fetch weather data: {str(e)}")
+
+        if "results" not in geo_data or not geo_data["results"]:
+            logger.error(f"No coordinates found for city: {city}")
+            return None
+
+        return geo_data["results"][0]
+
+    def get_archive(self, location: dict, start_date: str, end_date: str, sections: dict = None):
+        """Archive values of `sections` ({"daily"/"hourly": variables}, daily
+        DAILY_VARIABLES by default), each decoded into typed arrays as the
+        response streams in."""
+        sections = sections or {"daily": DAILY_VARIABLES}
+        logger.info(
+            f"Fetching archive for {location.get('name')} from {start_date} to {end_date}"
+        )
+        params = {
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        params.update({section: ",".join(variables) for section, variables in sections.items()})
+        try:
+            with tracing.span("archive"):
+                weather_data = run_sync(
+                    self.upstream.get_streamed(ARCHIVE_URL, params, ArchiveDecoder(sections))
+                )
 
             if "error" in weather_data:
-                raise ValueError(f"Weather API error: {weather_data['error']}")
+                raise ValueError(f"Weather API error: {weather_data.get('reason', weather_data['error'])}")
 
             return weather_data
         except httpx.HTTPError as e:
@@ -81,129 +126,354 @@ class WeatherAPI:
         except KeyError as e:
             logger.error(f"Unexpected API response format: {str(e)}")
             raise ValueError(f"Invalid API response format: {str(e)}")
+
+    def get_history_range(self, location: dict, start: date, end: date, sections: dict):
+        """Bulk path: the whole [start, end] range of every section in a single archive request.
+
+        Returns (first_day, {section: {variable: values}}) ready for the stores,
+        with empty values when the archive has nothing in the range yet.
+        """
+        data = self.get_archive(location, start.isoformat(), end.isoformat(), sections)
+        try:
+            times = data[next(iter(sections))]["time"]
+            first_day = times[0].astype("datetime64[D]").item() if len(times) else start
+            return first_day, {
+                section: {variable: data[section][variable] for variable in variables}
+                for section, variables in sections.items()
+            }
+        except (KeyError, IndexError) as e:
+            logger.error(f"Unexpected API response format: {str(e)}")
+            raise ValueError(f"Invalid API response format: {str(e)}")
+
+    def get_weather_data(self, city: str, start_date: str, end_date: str):
+        logger.info(f"Fetching weather data for {city} from {start_date} to {end_date}")
+        try:
+            location = self.get_location(city)
+            return self.get_archive(location, start_date, end_date)
         except Exception as e:
             logger.error(f"Error fetching weather data: {str(e)}")
             raise
-def compress_data(data: dict) -> bytes:
-    return zlib.compress(json.dumps(data).encode())
-
-def decompress_data(compressed_data: bytes) -> dict:
-    return json.loads(zlib.decompress(compressed_data).decode())
 
 def cache_key(city: str, month: int) -> str:
-    return f"weather:{city.lower()}:{month}"
+    return profile_key(city, month)
 
 def get_cached_profile(city: str, month: int):
-    key = cache_key(city, month)
-    cached = redis_conn.get(key)
-    return decompress_data(cached) if cached else None
+    with tracing.span("cache.get"):
+        return profile_cache.get(cache_key(city, month))
 
 def cache_profile(city: str, month: int, data: dict):
-    key = cache_key(city, month)
-    compressed_data = compress_data(data)
-    redis_conn.setex(key, CACHE_EXPIRY, compressed_data)
+    cache_profiles(city, [data])
+
+def cache_profiles(city: str, profiles: list):
+    """Write every monthly profile of a city in one pipelined round trip."""
+    profiles = {cache_key(city, profile["month"]): profile for profile in profiles if profile}
+    with tracing.span("cache.set"):
+        profile_cache.set_many(profiles)
+        climate_index.add(profiles)
+
+def schedule_refresh(city: str):
+    """Enqueue a background recompute of a stale city, at most once per REFRESH_LOCK_TTL."""
+    # All 12 months of a city go stale together, only the first one costs a round trip
+    seen, _ = recent_refreshes.get(city.lower())
+    if seen:
+        return
+    recent_refreshes.set(city.lower(), True, REFRESH_LOCK_TTL)
+    if redis_conn.set(refresh_lock_key(city), 1, nx=True, ex=REFRESH_LOCK_TTL):
+        logger.info(f"Serving stale profiles for {city}, scheduling refresh")
+        Queue(REFRESH_QUEUE, connection=redis_conn).enqueue(REFRESH_JOB, city)
 
-def cache_city_month(city: str, month: int):
+def refresh_city(city: str):
+    ingest_recent_days(city)
+    logger.info(f"Refreshed profiles for {city}")
+
+def cache_city(city: str):
     try:
-        if not get_cached_profile(city, month):
-            profile = get_monthly_profile(city, month)
-            cache_profile(city, month, profile)
-            logger.info(f"Cached data for {city} - Month {month}")
+        ingest_recent_days(city)
+        logger.info(f"Cached all months for {city}")
     except Exception as e:
-        logger.error(f"Failed to cache {city} month {month}: {str(e)}")
+        logger.error(f"Failed to cache {city}: {str(e)}")
+
+def cities_needing_warming(cities: list) -> list:
+    """Cities with a month missing or close to stale, in the given order, with one MGET.
+
+    Reads Redis directly so warming checks neither count as cache traffic
+    nor schedule refresh jobs.
+    """
+    if not cities:
+        return []
+    keys = [cache_key(city, month) for city in cities for month in range(1, 13)]
+    cached = redis_conn.mget(keys)
+    cold = []
+    for index, city in enumerate(cities):
+        profiles = cached[index * 12 : (index + 1) * 12]
+        if any(
+            value is None or profile_cache.is_stale(decode_profile(value), ahead=WARM_AHEAD)
+            for value in profiles
+        ):
+            cold.append(city)
+    return cold
+
+def load_history(city: str, weather_api: WeatherAPI = None, start: date = HISTORY_START) -> dict:
+    """{section: (dates, columns)} from `start` to the latest archived day for
+    every store, fetching only what the stores lack."""
+    end = history_end()
+    weather_api = weather_api or WeatherAPI()
+    location = weather_api.get_location(city)
+    key = daily_store.location_key(location["latitude"], location["longitude"])
+
+    # A range missing from both the daily and the hourly store is fetched once
+    missing = {}
+    for store in history_stores:
+        for date_range in store.missing_ranges(key, start, end):
+            missing.setdefault(date_range, []).append(store)
+    for (range_start, range_end), stores in missing.items():
+        logger.info(f"Store miss for {city} ({key}): fetching {range_start} to {range_end}")
+        first_day, sections = weather_api.get_history_range(
+            location, range_start, range_end, {store.section: store.variables for store in stores}
+        )
+        with tracing.span("store.write"):
+            for store in stores:
+                store.write(key, first_day, sections[store.section])
+
+    with tracing.span("store.read"):
+        return {
+            store.section: store.read(key, start, end) for store in history_stores
+        }
+
+
+def last_days(history: dict) -> dict:
+    """{section: last day with values} of every section of `history` that has any."""
+    return {
+        section: dates[-1].astype("datetime64[D]").item()
+        for section, (dates, _) in history.items()
+        if len(dates)
+    }
+
+
+def history_after(history: dict, through: dict) -> dict:
+    """`history` without the days each section has already folded in up to `through`."""
+    trimmed = {}
+    for section, (dates, columns) in history.items():
+        keep = dates >= np.datetime64(through[section] + timedelta(days=1))
+        trimmed[section] = (dates[keep], {variable: values[keep] for variable, values in columns.items()})
+    return trimmed
+
+
+def history_aggregates(history: dict) -> dict:
+    """{"<section>:<variable>": (12, 5) running aggregates} of every column in `history`."""
+    return {
+        f"{section}:{variable}": aggregation.monthly_aggregates(dates, values)
+        for section, (dates, columns) in history.items()
+        for variable, values in columns.items()
+    }
+
+
+# Profile field prefix of each archive variable: min_temp_avg, min_temp_std,
+# min_temp_p10... Other daily variables use their own name, other hourly
+# ones are prefixed with hourly_
+PROFILE_PREFIXES = {
+    ("daily", "temperature_2m_min"): "min_temp",
+    ("daily", "temperature_2m_max"): "max_temp",
+    ("daily", "precipitation_sum"): "precip",
+    ("daily", "relative_humidity_2m_mean"): "humidity",
+    ("hourly", "temperature_2m"): "hourly_temp",
+    ("hourly", "precipitation"): "hourly_precip",
+    ("hourly", "relative_humidity_2m"): "hourly_humidity",
+}
+
+
+def profile_prefix(section: str, variable: str) -> str:
+    default = variable if section == "daily" else f"{section}_{variable}"
+    return PROFILE_PREFIXES.get((section, variable), default)
+
+
+def build_profiles(city: str, history: dict) -> list:
+    """All 12 monthly profiles of a city from its history, None for months without temperatures.
+
+    Statistics are computed straight from the stores' memory-mapped columns,
+    one variable at a time.
+    """
+    stats = {
+        profile_prefix(section, variable): aggregation.monthly_stats(dates, values)
+        for section, (dates, columns) in history.items()
+        for variable, values in columns.items()
+    }
+    updated_at = datetime.now().isoformat()
+
+    profiles = []
+    for index in range(12):
+        if not stats["min_temp"]["count"][index] or not stats["max_temp"]["count"][index]:
+            profiles.append(None)
+            continue
+        profile = {"city": city, "month": index + 1}
+        for prefix, variable_stats in stats.items():
+            if not variable_stats["count"][index]:
+                continue
+            profile[f"{prefix}_avg"] = round(float(variable_stats["mean"][index]), 2)
+            profile[f"{prefix}_std"] = round(float(variable_stats["std"][index]), 2)
+            for column, pct in enumerate(aggregation.PERCENTILES):
+                profile[f"{prefix}_p{pct}"] = round(float(variable_stats["percentiles"][index, column]), 2)
+        profile["updated_at"] = updated_at
+        profiles.append(profile)
+    return profiles
+
+
+def compute_city_profiles(city: str) -> list:
+    """Build and cache all months of a city; concurrent misses across workers share one run."""
+    return single_flight.do(cache_key(city, "all"), lambda: _compute_city_profiles(city))
+
+
+def _compute_city_profiles(city: str) -> list:
+    try:
+        logger.info(f"Validating city {city}")
+        history = load_history(city)
+    except CityNotFound as e:
+        logger.error(f"Invalid city {city}: {str(e)}")
+        raise CityNotFound(f"City not found: {city}")
+    except ValueError as e:
+        # Upstream trouble, not the city's fault, so keep the error retryable
+        logger.error(f"Failed to load history for {city}: {str(e)}")
+        raise
+
+    try:
+        with tracing.span("aggregation"):
+            profiles = build_profiles(city, history)
+            aggregates = history_aggregates(history)
+        cache_profiles(city, profiles)
+        through = last_days(history)
+        if through:
+            climatology_store.save(city, through, date.today(), aggregates)
+        return profiles
+    except Exception as e:
+        logger.error(f"Error computing profiles for {city}: {str(e)}")
+        raise ValueError(f"Failed to fetch weather data: {str(e)}")
+
+
+def apply_aggregates(profiles: list, aggregates: dict) -> list:
+    """Copies of `profiles` with the mean and std of every variable taken from its
+    running aggregates. Percentiles can't be folded in and are kept."""
+    updated_at = datetime.now().isoformat()
+    profiles = [dict(profile, updated_at=updated_at) for profile in profiles]
+    for name, values in aggregates.items():
+        prefix = profile_prefix(*name.split(":", 1))
+        mean, std = aggregation.aggregate_mean_std(values)
+        for index, profile in enumerate(profiles):
+            if values[index, 0]:
+                profile[f"{prefix}_avg"] = round(float(mean[index]), 2)
+                profile[f"{prefix}_std"] = round(float(std[index]), 2)
+    return profiles
 
-def initialize_cache():
-    logger.info("Starting parallel cache initialization")
-    start_time = time.time()
-    
+
+def ingest_recent_days(city: str):
+    """Fold the days archived since the last run into a city's aggregates and profiles.
+
+    Costs one archive request for the new days and work proportional to them.
+    Cities without aggregates or cached profiles, with other variables, or whose
+    last full rebuild is REBUILD_INTERVAL_DAYS old (for the percentiles) are
+    rebuilt from the store instead.
+    """
+    stored = climatology_store.load(city)
+    # Straight from Redis, the profiles' own staleness must not schedule another refresh
+    cached = redis_conn.mget([cache_key(city, month) for month in range(1, 13)])
+    profiles = [decode_profile(value) if value else None for value in cached]
+    names = {f"{store.section}:{variable}" for store in history_stores for variable in store.variables}
+    if (
+        stored is None
+        or not all(profiles)
+        or set(stored[2]) != names
+        or set(stored[0]) != {store.section for store in history_stores}
+        or (date.today() - stored[1]).days >= REBUILD_INTERVAL_DAYS
+    ):
+        logger.info(f"Rebuilding profiles and aggregates of {city}")
+        compute_city_profiles(city)
+        return
+
+    through, built, aggregates = stored
+    new_through = through
+    # Each section folds in from its own last day, e.g. after a failed hourly write
+    if min(through.values()) < history_end():
+        history = history_after(
+            load_history(city, start=min(through.values()) + timedelta(days=1)), through
+        )
+        new_through = {**through, **last_days(history)}
+        with tracing.span("aggregation"):
+            for name, values in history_aggregates(history).items():
+                aggregates[name] = aggregation.merge_aggregates(aggregates[name], values)
+
+    profiles = apply_aggregates(profiles, aggregates)
+    if not climatology_store.save(city, new_through, built, aggregates, previous=through):
+        logger.info(f"Aggregates of {city} were updated concurrently, skipping")
+        return
+    cache_profiles(city, profiles)
+    folded = (min(new_through.values()) - min(through.values())).days
+    logger.info(f"Folded {folded} new days into {city}, now through {min(new_through.values())}")
+
+
+def get_cached_city_profiles(cities: list) -> dict:
+    """{city: [12 cached profiles or None]} for many cities with a single MGET."""
+    keys = {city: [cache_key(city, month) for month in range(1, 13)] for city in cities}
+    with tracing.span("cache.get"):
+        found = profile_cache.get_many([key for city_keys in keys.values() for key in city_keys])
+    return {city: [found[key] for key in city_keys] for city, city_keys in keys.items()}
+
+
+def get_many_city_profiles(cities: list) -> dict:
+    """All months of several cities: one MGET, then only the incomplete cities are computed."""
+    profiles = get_cached_city_profiles(cities)
+    missing = [city for city, city_profiles in profiles.items() if not all(city_profiles)]
+    if not missing:
+        logger.info(f"Cache hit for {cities}, all months")
+        popularity.record(cities)
+        return profiles
+
+    logger.info(f"Cache miss for {missing}, computing all months")
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = []
-        for city in TOP_CITIES:
-            for month in range(1, 13):
-                futures.append(
-                    executor.submit(cache_city_month, city, month)
-                )
-        
-        # Wait for all tasks to complete
-        for future in futures:
-            future.result()
-    
-    duration = time.time() - start_time
-    logger.info(f"Cache initialization completed in {duration:.2f} seconds")
+        for city, computed in zip(missing, executor.map(tracing.bind(compute_city_profiles), missing)):
+            profiles[city] = computed
+    popularity.record(cities)
+    return profiles
+
+
+def get_city_profiles(city: str) -> list:
+    return get_many_city_profiles([city])[city]
+
 
 def get_monthly_profile(city: str, month: int):
     cached = get_cached_profile(city, month)
     if cached:
         logger.info(f"Cache hit for {city}, month {month}")
+        popularity.record([city])
         return cached
         
     logger.info(f"Cache miss for {city}, month {month}")
-    weather_api = WeatherAPI()
-    
-    # Validate city first with a single API call
-    try:
-        logger.info(f"Validating city {city}")
-        test_data = weather_api.get_weather_data(
-            city, 
-            f"2023-{month:02d}-01", 
-            f"2023-{month:02d}-28"
-        )
-        # Store first month's data to avoid duplicate API call
-        all_temps = {
-            "min": test_data["daily"]["temperature_2m_min"],
-            "max": test_data["daily"]["temperature_2m_max"]
-        }
-    except ValueError as e:
-        logger.error(f"Invalid city {city}: {str(e)}")
-        raise ValueError(f"City not found: {city}")
-
-    # Only proceed with historical data if city is valid
-    try:
-        for year in range(2018, 2023):  # Skip 2023 since we already have it
-            logger.info(f"Fetching data for {city}, year {year}, month {month}")
-            data = weather_api.get_weather_data(
-                city,
-                f"{year}-{month:02d}-01",
-                f"{year}-{month:02d}-28"
-            )
-            all_temps["min"].extend(data["daily"]["temperature_2m_min"])
-            all_temps["max"].extend(data["daily"]["temperature_2m_max"])
-
-        result = {
-            "city": city,
-            "month": month,
-            "min_temp_avg": round(statistics.mean(all_temps["min"]), 2),
-            "max_temp_avg": round(statistics.mean(all_temps["max"]), 2),
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        cache_profile(city, month, result)
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error fetching historical data for {city}: {str(e)}")
-        raise ValueError(f"Failed to fetch weather data: {str(e)}")
+    profile = compute_city_profiles(city)[month - 1]
+    if profile is None:
+        raise ValueError(f"Failed to fetch weather data: no data for {city}, month {month}")
+    popularity.record([city])
+    return profile
 
 
 def find_best_month(city: str, min_temp: float, max_temp: float):
     logger.info(f"Finding best month for {city} with temp range {min_temp}-{max_temp}")
     try:
-        best_month_data = {"overall_diff": float("inf")}
-        
-        for month in range(1, 13):
-            profile = get_monthly_profile(city, month)
-            min_diff = abs(profile["min_temp_avg"] - min_temp)
-            max_diff = abs(profile["max_temp_avg"] - max_temp)
-            overall_diff = min_diff + max_diff
-            
-            if overall_diff < best_month_data["overall_diff"]:
-                best_month_data = {
-                    "city": city,
-                    "best_month": month,
-                    "min_temp_diff": round(min_diff, 2),
-                    "max_temp_diff": round(max_diff, 2),
-                    "overall_diff": round(overall_diff, 2)
-                }
+        profiles = get_city_profiles(city)
+        min_avg = aggregation.profile_matrix({city: profiles}, "min_temp_avg")[0]
+        max_avg = aggregation.profile_matrix({city: profiles}, "max_temp_avg")[0]
+        best, min_diff, max_diff, overall = aggregation.best_month(
+            min_avg, max_avg, min_temp, max_temp
+        )
+        best = int(best)
+        # Months without data score inf, so this only happens when no month has any
+        if np.isinf(overall[best]):
+            raise NoWeatherData(f"No temperature data for {city}")
+
+        best_month_data = {
+            "city": city,
+            "best_month": best + 1,
+            "min_temp_diff": round(float(min_diff[best]), 2),
+            "max_temp_diff": round(float(max_diff[best]), 2),
+            "overall_diff": round(float(overall[best]), 2)
+        }
         
         logger.info(f"Found best month for {city}: {best_month_data['best_month']}")
         return best_month_data
@@ -214,22 +484,26 @@ def find_best_month(city: str, min_temp: float, max_temp: float):
 def compare_cities(cities: list, month: int):
     logger.info(f"Comparing cities: {cities} for month {month}")
     try:
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            profiles = list(executor.map(
-                lambda city: get_monthly_profile(city.strip(), month),
-                cities
-            ))
+        cities = [city.strip() for city in cities]
+        profiles_by_city = get_many_city_profiles(cities)
+        profiles = list(profiles_by_city.values())
         
         if not profiles:
             raise ValueError("No valid city profiles could be retrieved")
-            
+
+        # cities x 12 months, then pick the requested month's column
+        min_avg = aggregation.profile_matrix(profiles_by_city, "min_temp_avg")[:, month - 1]
+        max_avg = aggregation.profile_matrix(profiles_by_city, "max_temp_avg")[:, month - 1]
+        if np.isnan(min_avg).any() or np.isnan(max_avg).any():
+            raise ValueError(f"Missing data for month {month}")
+
         # Restructure the response to match the model
         city_data = {
-            profile["city"]: {
-                "min_temp_avg": profile["min_temp_avg"],
-                "max_temp_avg": profile["max_temp_avg"]
+            city_profiles[month - 1]["city"]: {
+                "min_temp_avg": float(min_value),
+                "max_temp_avg": float(max_value)
             }
-            for profile in profiles
+            for city_profiles, min_value, max_value in zip(profiles, min_avg, max_avg)
         }
         
         result = {
@@ -244,8 +518,155 @@ def compare_cities(cities: list, month: int):
         logger.error(f"Error in compare_cities: {str(e)}")
         raise ValueError(f"Failed to compare cities: {str(e)}")
 
+def get_profiles_batch(batch_id: str, queries: dict):
+    """Profiles for {city: [months]}, pushed onto batch:<id> as each city completes.
+
+    Every cached profile of the batch is read with one MGET; only cities with
+    missing months are computed, concurrently.
+    """
+    logger.info(f"Processing batch {batch_id} with {len(queries)} cities")
+    results_key = f"batch:{batch_id}"
+    keys = {
+        city: [cache_key(city, month) for month in months]
+        for city, months in queries.items()
+    }
+    with tracing.span("cache.get"):
+        cached = profile_cache.get_many([key for city_keys in keys.values() for key in city_keys])
+
+    def publish(*results: dict):
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.rpush(results_key, *(json.dumps(result) for result in results))
+        pipe.expire(results_key, JOB_NOTIFY_EXPIRY)
+        pipe.execute()
+
+    def resolve(city: str):
+        months = queries[city]
+        try:
+            all_profiles = get_city_profiles(city)
+            profiles = [all_profiles[month - 1] for month in months]
+            if not all(profiles):
+                raise ValueError(f"Failed to fetch weather data: incomplete data for {city}")
+            publish({"city": city, "profiles": profiles})
+        except Exception as e:
+            logger.error(f"Batch {batch_id} failed for {city}: {str(e)}")
+            publish({"city": city, "error": str(e)})
+
+    complete = [city for city in queries if all(cached[key] for key in keys[city])]
+    incomplete = [city for city in queries if city not in complete]
+    if complete:
+        popularity.record(complete)
+        publish(*(
+            {"city": city, "profiles": [cached[key] for key in keys[city]]}
+            for city in complete
+        ))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(tracing.bind(resolve), incomplete))
+
+    logger.info(f"Completed batch {batch_id}: {len(complete)} cached, {len(incomplete)} computed")
+    return {"batch_id": batch_id, "cities": len(queries)}
+
+
+class NotifyingWorker(Worker):
+    """RQ worker that pushes each job's final status onto job-done:<id>.
+
+    The API blocks on that list instead of polling the job hash. Job timings
+    ride along on the same pipeline, so metrics cost no extra round trip.
+    Queues are polled in weighted-fair order (see fair_queue.py).
+    """
+
+    def __init__(self, queues, *args, **kwargs):
+        super().__init__(queues, *args, **kwargs)
+        self.fair_order = WeightedFairOrder()
+        self._ordered_queues = self.fair_order.order(self.queues, key=lambda queue: queue.name)
+
+    def reorder_queues(self, reference_queue):
+        position = self._ordered_queues.index(reference_queue)
+        idle = [queue.name for queue in self._ordered_queues[:position]]
+        self.fair_order.served(reference_queue.name, idle)
+        self._ordered_queues = self.fair_order.order(self.queues, key=lambda queue: queue.name)
+
+    def perform_job(self, job, queue):
+        # Runs in the work horse (or a job thread), so every span of the job lands in its trace
+        token = tracing.start_job(job)
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            tracing.end_job(token)
+
+    def handle_job_success(self, job, queue, started_job_registry):
+        super().handle_job_success(job, queue, started_job_registry)
+        record_job_metrics(job)
+        notify_job_done(job.id, "finished")
+
+    def handle_job_failure(self, job, queue, started_job_registry=None, exc_string=''):
+        # Called from perform_job's except block, so the job's exception is still current
+        kind = error_kind(sys.exc_info()[1])
+        if kind:
+            job.meta["error_kind"] = kind
+            job.save_meta()
+        super().handle_job_failure(job, queue, started_job_registry, exc_string)
+        record_job_metrics(job, error=True)
+        notify_job_done(job.id, "failed")
+
+class PoolWorker(NotifyingWorker, RecyclingWorker):
+    """NotifyingWorker that runs its jobs in-process, one per pool executor (WORKER_MODE=pool)."""
+
+def adopt_job_module():
+    """Jobs are enqueued as "worker.<function>". When this file runs as the main
+    script, resolve those here instead of importing a second, cold copy of it."""
+    sys.modules.setdefault("worker", sys.modules[__name__])
+
+def run_pool_executor(slot: int):
+    """Entry point of one pool executor process."""
+    adopt_job_module()
+    logger.info(f"Executor {slot} starting up")
+    metrics_emitter.start(redis_conn)
+    PoolWorker(WORKER_QUEUES, connection=redis_conn).work(max_jobs=WORKER_MAX_JOBS)
+
+def record_job_metrics(job, error: bool = False):
+    name = job.func_name.rsplit(".", 1)[-1]
+    trace = tracing.current()
+    if job.enqueued_at and job.started_at:
+        wait = (job.started_at - job.enqueued_at).total_seconds()
+        metrics_emitter.record(f"queue-wait:{name}", wait)
+        metrics_emitter.record(f"queue:{job.origin}", wait)
+        metrics_emitter.record("stage:queue_wait", wait)
+        if trace:
+            trace.queue_wait = wait
+    if job.started_at and job.ended_at:
+        metrics_emitter.record(f"job:{name}", (job.ended_at - job.started_at).total_seconds(), error)
+    if trace:
+        # Per-job time in each stage, metrics_service shows their percentiles side by side
+        for stage, duration in trace.stages().items():
+            metrics_emitter.record(f"stage:{stage}", duration)
+
+def notify_job_done(job_id: str, status: str):
+    key = f"job-done:{job_id}"
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.rpush(key, status)
+        pipe.expire(key, JOB_NOTIFY_EXPIRY)
+        trace = tracing.current()
+        if trace:
+            trace.write(pipe, status)
+        metrics_emitter.write(pipe)
+        popularity.write(pipe)
+        profile_cache.stats.write(pipe)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to notify completion of job {job_id}: {str(e)}")
+
 if __name__ == "__main__":
-    logger.info("Worker starting up")
-    initialize_cache()
-    worker = Worker(["default"], connection=redis_conn)
-    worker.work()
+    logger.info(f"Worker starting up in {WORKER_MODE} mode")
+    adopt_job_module()
+    # Samples recorded outside of jobs (warming, ingestion) are flushed by this thread,
+    # forked work horses don't inherit it and write theirs on the completion notice
+    metrics_emitter.start(redis_conn)
+    # Warming runs alongside job processing, so the worker takes jobs right away
+    warming_scheduler.start()
+    ingest_scheduler.start()
+    if WORKER_MODE == "pool":
+        Supervisor(WORKER_POOL_SIZE, run_pool_executor).run()
+    else:
+        worker = NotifyingWorker(WORKER_QUEUES, connection=redis_conn)
+        worker.work()
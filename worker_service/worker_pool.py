@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import resource
+import signal
+import time
+
+from rq import SimpleWorker
+
+from logger import setup_logger
+
+logger = setup_logger("worker_pool")
+
+# "fork": rq's default, a fresh work horse per job. "pool": WORKER_POOL_SIZE
+# long-lived processes that each run jobs in-process.
+WORKER_MODE = os.getenv("WORKER_MODE", "fork")
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "2"))
+# An executor is replaced after this many jobs or once its RSS grows past this
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "1000"))
+WORKER_MAX_RSS_MB = float(os.getenv("WORKER_MAX_RSS_MB", "512"))
+# Slow down restarts of an executor that keeps dying right away
+RESTART_BACKOFF = 5
+SUPERVISOR_INTERVAL = 1
+
+
+def current_rss_mb() -> float:
+    """Resident memory of this process, the peak RSS where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RecyclingWorker(SimpleWorker):
+    """Runs jobs in its own process instead of forking a work horse per job.
+
+    Connections, the upstream client and in-process caches (geocoding,
+    decoded profiles) stay warm from one job to the next. The worker stops
+    after a job that left it above `max_rss_mb` (run it with
+    work(max_jobs=...) to also cap the job count), and the pool supervisor
+    starts a fresh one in its place.
+    """
+
+    max_rss_mb = WORKER_MAX_RSS_MB
+
+    def execute_job(self, job, queue):
+        super().execute_job(job, queue)
+        rss = current_rss_mb()
+        if self.max_rss_mb and rss > self.max_rss_mb:
+            logger.info(f"Worker {self.name} is at {rss:.0f}MB RSS, recycling")
+            self._stop_requested = True
+
+
+class Supervisor:
+    """Keeps `size` processes running `target(slot)`, replacing any that exit.
+
+    Processes are spawned rather than forked, so they never inherit the
+    supervisor's threads (warming, upstream loop) or the locks they hold.
+    SIGTERM is passed on, executors finish their running job before exiting.
+    """
+
+    def __init__(self, size: int, target):
+        self.size = size
+        self.target = target
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = {}
+        self.started_at = {}
+        self.stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"Starting a pool of {self.size} job executors")
+        while not self.stopping:
+            for slot in range(self.size):
+                process = self.processes.get(slot)
+                if process is None or not process.is_alive():
+                    self._replace(slot, process)
+            time.sleep(SUPERVISOR_INTERVAL)
+
+        for process in self.processes.values():
+            process.join()
+        logger.info("All job executors stopped")
+
+    def _replace(self, slot: int, process):
+        if process is not None:
+            if process.exitcode and time.monotonic() - self.started_at[slot] < RESTART_BACKOFF:
+                return  # crashed right away, retried once RESTART_BACKOFF has passed
+            logger.info(f"Executor {slot} exited with code {process.exitcode}, starting a new one")
+        process = self.context.Process(target=self.target, args=(slot,), name=f"executor-{slot}")
+        process.start()
+        self.processes[slot] = process
+        self.started_at[slot] = time.monotonic()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        # Ctrl+C already reached the whole process group, a second signal would
+        # make rq abandon the running job
+        if signum != signal.SIGTERM:
+            return
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)